@@ -1,31 +1,56 @@
 from flask import Flask, render_template, render_template_string, request, jsonify, redirect, url_for, flash
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 import plotly.utils
-import json
 import os
 import sys
+from flask.json.provider import DefaultJSONProvider
 from werkzeug.utils import secure_filename
 import warnings
 import io
-import traceback
+import logging
+import threading
+import functools
 
 warnings.filterwarnings('ignore')
 
+# Copy-on-Write: slice/hasil sort tidak lagi perlu .copy() defensif
+pd.options.mode.copy_on_write = True
+
+# ===== Logging =====
+# Default WARNING: debug/progress messages cost only a level check per call.
+# Error path melampirkan traceback via exc_info hanya saat DEBUG; formatnya dikerjakan handler.
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'WARNING').upper()
+logging.basicConfig(level=LOG_LEVEL, format='%(levelname)s %(name)s: %(message)s')
+logger = logging.getLogger(__name__)
+
 # ===== Imports eksternal (best-effort) =====
 try:
     from multi_branch_analyzer import MultiBranchSalesAnalyzer
-    print("✅ MultiBranchSalesAnalyzer imported successfully")
+    logger.debug("✅ MultiBranchSalesAnalyzer imported successfully")
 except ImportError as e:
-    print(f"❌ Error importing MultiBranchSalesAnalyzer: {e}")
+    logger.error("❌ Error importing MultiBranchSalesAnalyzer: %s", e)
     MultiBranchSalesAnalyzer = None
 
+try:
+    from flask_compress import Compress
+except ImportError as e:
+    logger.warning("⚠️ flask_compress not available, responses will not be compressed: %s", e)
+    Compress = None
+
+try:
+    import orjson
+except ImportError as e:
+    logger.warning("⚠️ orjson not available, falling back to PlotlyJSONEncoder: %s", e)
+    orjson = None
+
 try:
     from chatbot import GroqChatbot
-    print("✅ GroqChatbot imported successfully")
+    logger.debug("✅ GroqChatbot imported successfully")
 except ImportError as e:
-    print(f"❌ Error importing GroqChatbot: {e}")
+    logger.error("❌ Error importing GroqChatbot: %s", e)
     GroqChatbot = None
 
 # ===== Flask App =====
@@ -42,6 +67,13 @@ app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024  # Reduced to 10MB for Verce
 app.config['DEBUG'] = False  # Always False in production
 app.config['UPLOAD_FOLDER'] = '/tmp'  # Use /tmp in Vercel
 
+# Kompresi response: HTML dashboard membawa JSON Plotly yang sangat repetitif
+app.config['COMPRESS_MIMETYPES'] = ['text/html', 'application/json']
+app.config['COMPRESS_LEVEL'] = 6
+app.config['COMPRESS_MIN_SIZE'] = 2048
+if Compress is not None:
+    Compress(app)
+
 # Create upload folder if it doesn't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
@@ -49,15 +81,86 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 analyzer = None
 current_data = None
 chatbot = None
+# Init gagal (mis. GROQ_API_KEY kosong) dicatat agar tidak diulang tiap request /chat;
+# direset saat upload berhasil, sehingga dicoba lagi sekali per upload
+_chatbot_init_failed = False
+_chatbot_lock = threading.Lock()
+
+def get_chatbot():
+    """Inisialisasi GroqChatbot secara lazy saat pertama kali /chat diakses."""
+    global chatbot, _chatbot_init_failed
+    if chatbot is None and GroqChatbot is not None and not _chatbot_init_failed:
+        with _chatbot_lock:
+            if chatbot is None and not _chatbot_init_failed:
+                try:
+                    chatbot = GroqChatbot()
+                    logger.debug("✅ Chatbot initialized")
+                except Exception as e:
+                    _chatbot_init_failed = True
+                    logger.warning("⚠️ Chatbot init failed: %s", e)
+    return chatbot
 
 # ===== Utils =====
 ALLOWED_EXTENSIONS = {'xlsx', 'xls'}
-def allowed_file(filename): return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+_ALLOWED_SUFFIXES = tuple(f'.{ext}' for ext in ALLOWED_EXTENSIONS)
+def allowed_file(filename): return filename.lower().endswith(_ALLOWED_SUFFIXES)
 
 def format_currency(v):
     try: return f"Rp {float(v):,.0f}"
     except: return "Rp 0"
 
+# Figure statis (placeholder & fallback) dibangun sekali saat import, bukan per request
+def _build_placeholder_chart():
+    fig = go.Figure()
+    fig.add_annotation(text="Data sedang diproses, silakan refresh halaman",
+                       xref="paper", yref="paper", x=0.5, y=0.5, showarrow=False,
+                       font=dict(size=16, color="gray"))
+    fig.update_layout(height=300)
+    return fig.to_plotly_json()
+
+_PLACEHOLDER_CHART = _build_placeholder_chart()
+_ERROR_CHART = {"data": [], "layout": {"title": "Chart tidak dapat dimuat"}}
+_NO_DATA_CHART = {"data": [], "layout": {"title": "No Data"}}
+_TIME_CHART_KEYS = ('daily_pattern', 'branch_trends', 'monthly_comparison')
+
+# Index posisi untuk bar Top-N (x + tickvals) dibangun sekali per panjang; jumlah
+# bar per chart kecil (Top-N / jumlah cabang) sehingga cache tetap kecil
+_IDX_CACHE_MAX = 64
+_IDX = {n: list(range(n)) for n in (3, 7, 8, 10, 12, 15, 20, 30)}
+
+def bar_index(n):
+    idx = _IDX.get(n)
+    if idx is None:
+        idx = list(range(n))
+        if n <= _IDX_CACHE_MAX:
+            _IDX[n] = idx
+    return idx
+
+# Layout bar Top-N (tinggi, margin label miring, tanpa legend) dipakai ulang di semua
+# chart bar; update_layout hanya membaca dict ini, tidak mengubahnya
+_BAR_MARGIN = {'l': 20, 'r': 20, 't': 40, 'b': 120}
+_LAYOUT_BAR_400 = {'height': 400, 'margin': _BAR_MARGIN, 'showlegend': False}
+_LAYOUT_BAR_500 = {'height': 500, 'margin': _BAR_MARGIN, 'showlegend': False}
+
+# Formatter label chart di level modul; Rupiah dibulatkan sekali secara vektor lalu
+# diformat sebagai int (grouping int lebih murah daripada format float ",.0f")
+_FMT_CURRENCY = "Rp {:,}".format
+_FMT_PERCENT = "{:.1f}%".format
+
+def currency_labels(values):
+    """Label "Rp 1,234" untuk satu kolom sekaligus."""
+    rounded = np.rint(values.to_numpy(dtype=float))
+    if not np.isfinite(rounded).all():
+        return [f"Rp {x:,.0f}" for x in values.tolist()]
+    return list(map(_FMT_CURRENCY, rounded.astype(np.int64).tolist()))
+
+def percent_labels(values): return list(map(_FMT_PERCENT, values.tolist()))
+
+def bar_heights(values):
+    """Tinggi bar sebagai ndarray float64 (presisi penuh, sama dengan angka JS di browser),
+    sehingga hover default cocok dengan label teks currency_labels/percent_labels."""
+    return values.to_numpy(dtype=float)
+
 def format_percentage(v):
     try: return f"{float(v):.1f}%"
     except: return "0%"
@@ -73,9 +176,77 @@ def safe_divide(a, b):
     except:
         return 0
 
+# ===== Chart Encoding =====
+# Chart builder mengembalikan dict figure; seluruh dict di-encode SEKALI per halaman.
+# orjson meng-encode dict/list/ndarray numerik di C; sisanya lewat _plotly_default.
+_PLOTLY_ENCODER = plotly.utils.PlotlyJSONEncoder()
+_ORJSON_OPTS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+def _plotly_default(obj):
+    """Fallback orjson, urutan sama seperti PlotlyJSONEncoder.default."""
+    if hasattr(obj, 'to_plotly_json'):
+        return obj.to_plotly_json()
+    if obj is pd.NaT or obj is np.ma.masked:
+        return None
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+_COLOR_TEAL = 'rgba(0,139,139,0.8)'
+_COLOR_DARK_ORANGE = 'rgba(255,140,0,0.8)'
+_COLOR_ORANGE = 'rgba(255,165,0,0.8)'
+_COLOR_LIME = 'rgba(50,205,50,0.8)'
+
+def charts_to_json(charts):
+    if orjson is None:
+        return _PLOTLY_ENCODER.encode(charts or {})
+    return orjson.dumps(charts or {}, default=_plotly_default, option=_ORJSON_OPTS).decode()
+
+class OrjsonJSONProvider(DefaultJSONProvider):
+    """jsonify() lewat orjson: bytes hasil encode langsung jadi body Response, tanpa str perantara.
+
+    Keluaran mengikuti DefaultJSONProvider: date/datetime tetap HTTP-date lewat default Flask,
+    indent di mode debug. Key tidak di-sort ulang (urutan dict dipertahankan).
+    """
+
+    sort_keys = False
+
+    @staticmethod
+    def _orjson_default(obj):
+        # Default Flask dulu (date -> HTTP-date, Decimal, UUID, __html__), lalu numpy/pandas
+        try:
+            return DefaultJSONProvider.default(obj)
+        except TypeError:
+            return _plotly_default(obj)
+
+    def _orjson_options(self, indent=False):
+        option = _ORJSON_OPTS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        # Argumen json.dumps (indent, sort_keys, ...) tidak dikenal orjson: pakai encoder bawaan
+        if kwargs:
+            kwargs.setdefault('default', self._orjson_default)
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self._orjson_default, option=self._orjson_options()).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self._orjson_default, option=self._orjson_options(indent))
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+if orjson is not None:
+    app.json = OrjsonJSONProvider(app)
+
 def safe_df_check(df):
-    try: return df is not None and hasattr(df, "empty") and not df.empty
-    except: return False
+    return df is not None and getattr(df, 'shape', (0,))[0] > 0
 
 # ===== Jinja Filters =====
 @app.template_filter('currency')
@@ -96,7 +267,7 @@ def round_filter(v, precision=2):
 @app.route('/')
 def index():
     global analyzer, current_data
-    print("🔍 Dashboard route accessed")
+    logger.debug("🔍 Dashboard route accessed")
 
     if analyzer is None or not safe_df_check(current_data):
         return render_template('upload.html')
@@ -109,26 +280,26 @@ def index():
         total_margin = summary_stats.get('total_margin', 0)
         gross_margin_pct = safe_divide(total_margin, total_revenue) * 100
 
-        charts_data = create_dashboard_charts()
+        charts_data = create_dashboard_charts(branch_comp)
 
         return render_template(
             'dashboard.html',
             summary_stats=summary_stats,
             branch_comparison=branch_comp,
             charts_data=charts_data,
+            charts_json=charts_to_json(charts_data),
             total_revenue=format_currency(total_revenue),
             total_margin=format_currency(total_margin),
             gross_margin_pct=format_percentage(gross_margin_pct),
             branches=analyzer.branches
         )
     except Exception as e:
-        print(f"❌ Error in dashboard: {e}")
-        print(traceback.format_exc())
+        logger.error("❌ Error in dashboard: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
         return render_template('upload.html')
 
 @app.route('/upload', methods=['GET', 'POST'])
 def upload_files():
-    print("📁 Upload route accessed")
+    logger.debug("📁 Upload route accessed")
     if request.method == 'POST':
         # Check if this is an AJAX request
         is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
@@ -156,9 +327,9 @@ def upload_files():
                     path = os.path.join(app.config['UPLOAD_FOLDER'], name)
                     f.save(path)
                     uploaded.append(path)
-                    print(f"📄 Saved: {name}")
+                    logger.debug("📄 Saved: %s", name)
                 except Exception as e:
-                    print(f"❌ Failed to save {f.filename}: {e}")
+                    logger.error("❌ Failed to save %s: %s", f.filename, e)
                     failed_files.append(f.filename)
             else:
                 failed_files.append(f.filename if hasattr(f, 'filename') else 'Unknown file')
@@ -176,7 +347,7 @@ def upload_files():
             return redirect(request.url)
 
         try:
-            global analyzer, current_data, chatbot
+            global analyzer, current_data, _chatbot_init_failed
             if MultiBranchSalesAnalyzer is None:
                 error_msg = 'Analyzer module not available. Check imports.'
                 if is_ajax:
@@ -194,7 +365,7 @@ def upload_files():
                         b.name = os.path.basename(p)
                         buffers.append(b)
                 except Exception as e:
-                    print(f"❌ Error reading file {p}: {e}")
+                    logger.error("❌ Error reading file %s: %s", p, e)
                     continue
 
             if not buffers:
@@ -212,16 +383,8 @@ def upload_files():
                 flash(error_msg, 'danger')
                 return redirect(url_for('upload_files'))
 
-            # Initialize chatbot (optional)
-            try:
-                chatbot = GroqChatbot() if GroqChatbot else None
-                if chatbot: 
-                    print("✅ Chatbot initialized")
-                else:
-                    print("⚠️ Chatbot not available (GroqChatbot not imported)")
-            except Exception as e:
-                print(f"⚠️ Chatbot init failed: {e}")
-                chatbot = None
+            # Data baru: chatbot yang gagal diinisialisasi boleh dicoba lagi di /chat
+            _chatbot_init_failed = False
 
             # Cleanup uploaded files
             for p in uploaded:
@@ -229,14 +392,14 @@ def upload_files():
                     if os.path.exists(p): 
                         os.remove(p)
                 except Exception as e:
-                    print(f"⚠️ Could not remove temp file {p}: {e}")
+                    logger.warning("⚠️ Could not remove temp file %s: %s", p, e)
 
             # Success message with details
             success_msg = f'Successfully loaded {len(uploaded)} files with {len(current_data)} records from {len(analyzer.branches)} branches!'
             if failed_files:
                 success_msg += f' Note: {len(failed_files)} files could not be processed.'
             
-            print(f"✅ Upload successful: {success_msg}")
+            logger.debug("✅ Upload successful: %s", success_msg)
             
             # HANDLE AJAX vs REGULAR REQUEST DIFFERENTLY
             if is_ajax:
@@ -254,8 +417,7 @@ def upload_files():
                 return redirect(url_for('index'))
 
         except Exception as e:
-            print(f"❌ Upload processing error: {e}")
-            print(traceback.format_exc())
+            logger.error("❌ Upload processing error: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
             
             # Cleanup files on error
             for p in uploaded:
@@ -287,10 +449,10 @@ def branch_comparison():
     try:
         data = analyzer.get_branch_revenue_comparison()
         charts = create_branch_comparison_charts(data)
-        return render_template('branch_comparison.html', branch_data=data, charts=charts)
+        return render_template('branch_comparison.html', branch_data=data, charts=charts,
+                               charts_json=charts_to_json(charts))
     except Exception as e:
-        print(f"❌ Branch comparison error: {e}")
-        print(traceback.format_exc())
+        logger.error("❌ Branch comparison error: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
         flash(f'Error loading branch comparison: {e}', 'danger')
         return redirect(url_for('index'))
 
@@ -309,7 +471,7 @@ def product_analysis():
             return redirect(url_for('index'))
 
         top_products = (
-            df.groupby('Menu')
+            df.groupby('Menu', observed=True)
               .agg({'Qty': 'sum', 'Total': 'sum', 'Margin': 'sum'})
               .reset_index()
         )
@@ -320,8 +482,7 @@ def product_analysis():
 
         return render_template('product_analysis.html', product_data=df, top_products=top_products)
     except Exception as e:
-        print(f"❌ Product analysis error: {e}")
-        print(traceback.format_exc())
+        logger.error("❌ Product analysis error: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
         flash(f'Error loading product analysis: {e}', 'danger')
         return redirect(url_for('index'))
 
@@ -351,7 +512,7 @@ def sales_by_time():
             time_analysis = {k: {'data': [], 'columns': [], 'length': 0}
                              for k in ['hourly','daily_pattern','daily_trend','weekly','monthly']}
 
-        charts = create_time_charts_all_branches(time_analysis)
+        charts = create_time_charts_all_branches(raw if isinstance(raw, dict) else {})
 
         summary_stats = {
             'total_branches': len(analyzer.branches) if analyzer.branches else 0,
@@ -366,17 +527,17 @@ def sales_by_time():
         return render_template('sales_by_time.html',
                                time_data=time_analysis,
                                charts=charts,
+                               charts_json=charts_to_json(charts),
                                summary_stats=summary_stats)
     except Exception as e:
-        print(f"❌ Sales-by-time error: {e}")
-        print(traceback.format_exc())
-        empty = json.dumps({"data": [], "layout": {"title": "No Data"}})
-        fallback_charts = {'daily_pattern': empty, 'branch_trends': empty, 'monthly_comparison': empty}
+        logger.error("❌ Sales-by-time error: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
+        fallback_charts = dict.fromkeys(_TIME_CHART_KEYS, _NO_DATA_CHART)
         fallback_time = {k: {'data': [], 'columns': [], 'length': 0}
                          for k in ['hourly','daily_pattern','daily_trend','weekly','monthly']}
         fallback_stats = {'total_branches': 0, 'date_range': "No data", 'total_records': 0}
         return render_template('sales_by_time.html',
-                               time_data=fallback_time, charts=fallback_charts, summary_stats=fallback_stats)
+                               time_data=fallback_time, charts=fallback_charts,
+                               charts_json=charts_to_json(fallback_charts), summary_stats=fallback_stats)
 
 @app.route('/cogs-analysis')
 def cogs_analysis():
@@ -392,53 +553,63 @@ def cogs_analysis():
             flash('No COGS data available for analysis.', 'warning')
             return redirect(url_for('index'))
 
-        branch_cogs = cogs.groupby('Branch')['COGS Total (%)'].mean().reset_index()
+        branch_cogs = cogs.groupby('Branch', observed=True, sort=False)['COGS Total (%)'].mean().reset_index()
         branch_cogs['COGS_Efficiency'] = 100 - branch_cogs['COGS Total (%)']
         branch_cogs = branch_cogs.sort_values('COGS_Efficiency', ascending=False)
 
         charts = create_cogs_analysis_charts(cogs, branch_cogs)
-        return render_template('cogs_analysis.html', cogs_data=cogs, branch_cogs=branch_cogs, charts=charts)
+        return render_template('cogs_analysis.html', cogs_data=cogs, branch_cogs=branch_cogs, charts=charts,
+                               charts_json=charts_to_json(charts))
     except Exception as e:
-        print(f"❌ COGS analysis error: {e}")
-        print(traceback.format_exc())
+        logger.error("❌ COGS analysis error: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
         flash(f'Error loading COGS analysis: {e}', 'danger')
         return redirect(url_for('index'))
 
 @app.route('/chat', methods=['GET', 'POST'])
 def chat():
-    global analyzer, chatbot
+    global analyzer
     if analyzer is None:
         flash('No data available. Please upload files first.', 'warning')
         return redirect(url_for('upload_files'))
 
+    cb = get_chatbot()
     if request.method == 'POST':
         q = request.form.get('question', '').strip()
-        if q and chatbot:
+        if q and cb:
             try:
                 ctx = analyzer.prepare_data_for_ai()
-                ans = chatbot.get_response(q, ctx)
+                ans = cb.get_response(q, ctx)
                 return jsonify({'success': True, 'response': ans})
             except Exception as e:
-                print(f"❌ Chat error: {e}")
+                logger.error("❌ Chat error: %s", e)
                 return jsonify({'success': False, 'error': str(e)})
         return jsonify({'success': False, 'error': 'No question provided or chatbot not available'})
 
-    return render_template('chat.html', chatbot_available=chatbot is not None)
+    return render_template('chat.html', chatbot_available=cb is not None)
+
+# Isi folder templates hanya berubah saat deploy: cukup dibaca sekali per proses
+@functools.lru_cache(maxsize=1)
+def _template_inventory():
+    folder = app.template_folder
+    exists = os.path.exists(folder)
+    files = tuple(f for f in os.listdir(folder) if f.endswith('.html')) if exists else ()
+    return os.path.abspath(folder), exists, files
 
 @app.route('/debug')
 def debug_status():
+    templates_dir, templates_exist, template_files = _template_inventory()
     status = {
         'analyzer_loaded': analyzer is not None,
         'data_loaded': safe_df_check(current_data),
         'chatbot_loaded': chatbot is not None,
-        'templates_dir': os.path.abspath(app.template_folder),
-        'templates_exist': os.path.exists(app.template_folder),
+        'templates_dir': templates_dir,
+        'templates_exist': templates_exist,
         'current_dir': os.getcwd(),
         'python_path': sys.path[:3],
         'vercel_deployment': True
     }
-    if os.path.exists(app.template_folder):
-        status['template_files'] = [f for f in os.listdir(app.template_folder) if f.endswith('.html')]
+    if templates_exist:
+        status['template_files'] = list(template_files)
     if analyzer and safe_df_check(current_data):
         status['data_summary'] = {
             'total_records': len(current_data),
@@ -449,35 +620,42 @@ def debug_status():
     return jsonify(status)
 
 # ===== Chart Builders =====
-def create_dashboard_charts():
+def create_dashboard_charts(df=None):
+    """Chart dashboard; df = hasil get_branch_revenue_comparison() yang sudah dihitung route."""
     global analyzer
     charts = {}
     try:
-        df = analyzer.get_branch_revenue_comparison()
+        if df is None:
+            df = analyzer.get_branch_revenue_comparison()
         if not safe_df_check(df): return charts
 
+        # Urutan revenue dipakai bar Top 10 dan pie Top 8: sort sekali
+        ranked = df.sort_values('Total_Revenue', ascending=False)
+
         # Revenue bar (Top 10 untuk kerapian di dashboard)
-        top = df.sort_values('Total_Revenue', ascending=False).head(10).copy()
+        top = ranked.head(10)
+        idx = bar_index(len(top))
         fig_revenue = go.Figure([go.Bar(
-            x=list(range(len(top))),
-            y=top['Total_Revenue'].tolist(),
-            text=[f'Rp {x:,.0f}' for x in top['Total_Revenue']],
+            x=idx,
+            y=bar_heights(top['Total_Revenue']),
+            text=currency_labels(top['Total_Revenue']),
             textposition='outside',
-            marker_color='rgba(0,139,139,0.8)'
+            marker_color=_COLOR_TEAL
         )])
         fig_revenue.update_layout(
             title='📊 Revenue per Cabang (Top 10)',
-            xaxis=dict(tickmode='array', tickvals=list(range(len(top))), ticktext=top['Branch'].tolist(), tickangle=-45),
-            yaxis_title='Revenue (Rp)', height=400, margin=dict(l=20,r=20,t=40,b=120), showlegend=False
+            xaxis=dict(tickmode='array', tickvals=idx, ticktext=top['Branch'].to_numpy(), tickangle=-45),
+            yaxis_title='Revenue (Rp)',
+            **_LAYOUT_BAR_400
         )
-        charts['revenue_bar'] = json.dumps(fig_revenue, cls=plotly.utils.PlotlyJSONEncoder)
+        charts['revenue_bar'] = fig_revenue.to_plotly_json()
 
         # Revenue Pie (Top 8)
-        top8 = df.sort_values('Total_Revenue', ascending=False).head(8)
+        top8 = ranked.head(8)
         fig_pie = px.pie(top8, values='Total_Revenue', names='Branch', title='📊 Distribusi Revenue per Cabang (Top 8)')
         fig_pie.update_traces(textposition='inside', textinfo='percent+label')
         fig_pie.update_layout(height=400)
-        charts['revenue_pie'] = json.dumps(fig_pie, cls=plotly.utils.PlotlyJSONEncoder)
+        charts['revenue_pie'] = fig_pie.to_plotly_json()
 
         # Performance matrix
         fig_scatter = go.Figure()
@@ -493,33 +671,34 @@ def create_dashboard_charts():
             title='💎 Matrix Performa Cabang (Revenue vs Margin)',
             xaxis_title='Total Revenue (Rp)', yaxis_title='Margin (%)', height=400
         )
-        charts['performance_matrix'] = json.dumps(fig_scatter, cls=plotly.utils.PlotlyJSONEncoder)
+        charts['performance_matrix'] = fig_scatter.to_plotly_json()
 
         # Top products (dashboard context)
         try:
             prod = analyzer.get_product_comparison_by_branch(10)
             if safe_df_check(prod):
-                top_prod = (prod.groupby('Menu').agg({'Qty':'sum','Total':'sum'}).reset_index()
+                top_prod = (prod.groupby('Menu', observed=True).agg({'Qty':'sum','Total':'sum'}).reset_index()
                             .sort_values('Total', ascending=False).head(10))
+                idx = bar_index(len(top_prod))
                 fig_prod = go.Figure([go.Bar(
-                    x=list(range(len(top_prod))),
-                    y=top_prod['Total'].tolist(),
-                    text=[f'Rp {x:,.0f}' for x in top_prod['Total']],
+                    x=idx,
+                    y=bar_heights(top_prod['Total']),
+                    text=currency_labels(top_prod['Total']),
                     textposition='outside',
-                    marker_color='rgba(255,140,0,0.8)'
+                    marker_color=_COLOR_DARK_ORANGE
                 )])
                 fig_prod.update_layout(
                     title='🍜 Top 10 Produk by Revenue',
-                    xaxis=dict(tickmode='array', tickvals=list(range(len(top_prod))), ticktext=top_prod['Menu'].tolist(), tickangle=-45),
-                    yaxis_title='Revenue (Rp)', height=400, margin=dict(l=20,r=20,t=40,b=120), showlegend=False
+                    xaxis=dict(tickmode='array', tickvals=idx, ticktext=top_prod['Menu'].to_numpy(), tickangle=-45),
+                    yaxis_title='Revenue (Rp)',
+                    **_LAYOUT_BAR_400
                 )
-                charts['top_products'] = json.dumps(fig_prod, cls=plotly.utils.PlotlyJSONEncoder)
+                charts['top_products'] = fig_prod.to_plotly_json()
         except Exception as e:
-            print(f"⚠️ Products chart error: {e}")
+            logger.warning("⚠️ Products chart error: %s", e)
 
     except Exception as e:
-        print(f"❌ Dashboard charts error: {e}")
-        print(traceback.format_exc())
+        logger.error("❌ Dashboard charts error: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
     return charts
 
 def create_branch_comparison_charts(df):
@@ -527,53 +706,43 @@ def create_branch_comparison_charts(df):
     try:
         if not safe_df_check(df): return charts
 
-        ordered = df.sort_values('Total_Revenue', ascending=False).copy()
+        ordered = df.sort_values('Total_Revenue', ascending=False)
+        idx = bar_index(len(ordered))
         fig_rev = go.Figure([go.Bar(
-            x=list(range(len(ordered))),
-            y=ordered['Total_Revenue'].tolist(),
-            text=[f'Rp {x:,.0f}' for x in ordered['Total_Revenue']],
+            x=idx,
+            y=bar_heights(ordered['Total_Revenue']),
+            text=currency_labels(ordered['Total_Revenue']),
             textposition='outside',
-            marker_color='rgba(0,139,139,0.8)'
+            marker_color=_COLOR_TEAL
         )])
         fig_rev.update_layout(
             title='💰 Total Revenue per Cabang',
-            xaxis=dict(tickmode='array', tickvals=list(range(len(ordered))), ticktext=ordered['Branch'].tolist(), tickangle=-45),
-            yaxis_title='Revenue (Rp)', height=500, margin=dict(l=20,r=20,t=40,b=120), showlegend=False
+            xaxis=dict(tickmode='array', tickvals=idx, ticktext=ordered['Branch'].to_numpy(), tickangle=-45),
+            yaxis_title='Revenue (Rp)',
+            **_LAYOUT_BAR_500
         )
-        charts['revenue_comparison'] = json.dumps(fig_rev, cls=plotly.utils.PlotlyJSONEncoder)
+        charts['revenue_comparison'] = fig_rev.to_plotly_json()
 
-        fig_mc = go.Figure()
-        fig_mc.add_trace(go.Scatter(
-            x=df['COGS_Percentage'],
-            y=df['Margin_Percentage'],
-            mode='markers',
-            marker=dict(size=12, color=df['Total_Revenue'], colorscale='Viridis', showscale=True, colorbar=dict(title="Revenue (Rp)")),
-            text=df['Branch'],
-            hovertemplate='<b>%{text}</b><br>COGS: %{x:.1f}%<br>Margin: %{y:.1f}%<extra></extra>'
-        ))
-        fig_mc.update_layout(title='📊 Margin vs COGS per Cabang', xaxis_title='COGS (%)', yaxis_title='Margin (%)', height=500)
-        charts['margin_cogs'] = json.dumps(fig_mc, cls=plotly.utils.PlotlyJSONEncoder)
-
-        tmp = df.copy()
-        tmp['Revenue_per_Transaction'] = tmp.apply(lambda r: safe_divide(r['Total_Revenue'], r['Transaction_Count']), axis=1)
+        tmp = df.assign(Revenue_per_Transaction=df.apply(lambda r: safe_divide(r['Total_Revenue'], r['Transaction_Count']), axis=1))
         eff = tmp.sort_values('Revenue_per_Transaction', ascending=False)
+        idx = bar_index(len(eff))
         fig_eff = go.Figure([go.Bar(
-            x=list(range(len(eff))),
-            y=eff['Revenue_per_Transaction'].tolist(),
-            text=[f'Rp {x:,.0f}' for x in eff['Revenue_per_Transaction']],
+            x=idx,
+            y=bar_heights(eff['Revenue_per_Transaction']),
+            text=currency_labels(eff['Revenue_per_Transaction']),
             textposition='outside',
-            marker_color='rgba(255,165,0,0.8)'
+            marker_color=_COLOR_ORANGE
         )])
         fig_eff.update_layout(
             title='⚡ Efisiensi Revenue per Transaksi',
-            xaxis=dict(tickmode='array', tickvals=list(range(len(eff))), ticktext=eff['Branch'].tolist(), tickangle=-45),
-            yaxis_title='Revenue per Transaksi (Rp)', height=500, margin=dict(l=20,r=20,t=40,b=120), showlegend=False
+            xaxis=dict(tickmode='array', tickvals=idx, ticktext=eff['Branch'].to_numpy(), tickangle=-45),
+            yaxis_title='Revenue per Transaksi (Rp)',
+            **_LAYOUT_BAR_500
         )
-        charts['efficiency'] = json.dumps(fig_eff, cls=plotly.utils.PlotlyJSONEncoder)
+        charts['efficiency'] = fig_eff.to_plotly_json()
 
     except Exception as e:
-        print(f"❌ Branch comparison charts error: {e}")
-        print(traceback.format_exc())
+        logger.error("❌ Branch comparison charts error: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
     return charts
 
 def create_cogs_analysis_charts(cogs, branch_cogs):
@@ -583,49 +752,46 @@ def create_cogs_analysis_charts(cogs, branch_cogs):
 
         # Branch efficiency only (skip complex heatmap for Vercel)
         ordered = branch_cogs.sort_values('COGS_Efficiency', ascending=False)
+        idx = bar_index(len(ordered))
         fig_eff = go.Figure([go.Bar(
-            x=list(range(len(ordered))),
-            y=ordered['COGS_Efficiency'].tolist(),
-            text=[f'{x:.1f}%' for x in ordered['COGS_Efficiency']],
+            x=idx,
+            y=bar_heights(ordered['COGS_Efficiency']),
+            text=percent_labels(ordered['COGS_Efficiency']),
             textposition='outside',
-            marker_color='rgba(50,205,50,0.8)'
+            marker_color=_COLOR_LIME
         )])
         fig_eff.update_layout(
             title='📊 Efisiensi COGS per Cabang',
-            xaxis=dict(tickmode='array', tickvals=list(range(len(ordered))), ticktext=ordered['Branch'].tolist(), tickangle=-45),
-            yaxis_title='Efisiensi COGS (%)', height=500, margin=dict(l=20,r=20,t=40,b=120), showlegend=False
+            xaxis=dict(tickmode='array', tickvals=idx, ticktext=ordered['Branch'].to_numpy(), tickangle=-45),
+            yaxis_title='Efisiensi COGS (%)',
+            **_LAYOUT_BAR_500
         )
-        charts['branch_efficiency'] = json.dumps(fig_eff, cls=plotly.utils.PlotlyJSONEncoder)
+        charts['branch_efficiency'] = fig_eff.to_plotly_json()
 
     except Exception as e:
-        print(f"❌ COGS charts error: {e}")
-        print(traceback.format_exc())
+        logger.error("❌ COGS charts error: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
     return charts
 
-def create_time_charts_all_branches(time_analysis):
-    """Time analysis. Branch trends: SEMUA cabang, hover single-trace only."""
+def create_time_charts_all_branches(time_frames):
+    """Time analysis (dict of DataFrames). Branch trends: SEMUA cabang, hover single-trace only."""
     charts = {}
     try:
         # Branch trends (ALL branches) — HOVER PER TRACE
-        if time_analysis.get('daily_trend', {}).get('length', 0) > 0:
-            trend = time_analysis['daily_trend']['data']
-            per_branch, totals = {}, {}
-            for row in trend:
-                br = row.get('Branch', 'Unknown')
-                dt = row.get('Date')
-                rv = row.get('Total', 0) or 0
-                per_branch.setdefault(br, []).append((dt, rv))
-                totals[br] = totals.get(br, 0) + rv
-
-            ordered = [b for b, _ in sorted(totals.items(), key=lambda x: x[1], reverse=True)]
-
-            fig_trends = go.Figure()
+        trend = time_frames.get('daily_trend')
+        if safe_df_check(trend):
+            # daily_trend hasil groupby(['Branch', 'Date']) sudah terurut per tanggal di tiap cabang;
+            # satu groupby memberi slice per cabang tanpa scan/sort ulang per cabang
+            totals = trend.groupby('Branch', observed=True, sort=False)['Total'].sum()
+            ordered = totals.sort_values(ascending=False, kind='stable').index
+            per_branch = trend.groupby('Branch', observed=True, sort=False)
+
+            # Trace sebagai dict biasa, satu konstruksi Figure (bukan add_trace per cabang)
+            traces = []
             for br in ordered:
-                pts = sorted(per_branch[br], key=lambda x: x[0] or "")
-                xs = [p[0] for p in pts]
-                ys = [p[1] for p in pts]
-                fig_trends.add_trace(go.Scatter(
-                    x=xs, y=ys,
+                pts = per_branch.get_group(br)
+                traces.append(dict(
+                    type='scatter',
+                    x=pts['Date'], y=pts['Total'],
                     mode='lines+markers',
                     name=br,
                     line=dict(width=2),
@@ -633,13 +799,13 @@ def create_time_charts_all_branches(time_analysis):
                     hovertemplate="<b>%{x}</b><br>Branch: " + br + "<br>Revenue: Rp %{y:,.0f}<extra></extra>"
                 ))
 
-            fig_trends.update_layout(
+            fig_trends = go.Figure(data=traces, layout=dict(
                 title='📅 Branch Sales Trends Over Time (All Branches)',
-                xaxis_title='Tanggal',
-                yaxis_title='Revenue (Rp)',
+                yaxis=dict(title='Revenue (Rp)'),
                 height=450,
                 hovermode='closest',
                 xaxis=dict(
+                    title='Tanggal',
                     showspikes=True, spikemode='across', spikesnap='cursor', spikethickness=1
                 ),
                 spikedistance=-1,
@@ -647,48 +813,38 @@ def create_time_charts_all_branches(time_analysis):
                 legend=dict(orientation='h', y=-0.2),
                 margin=dict(t=60, l=60, r=20, b=80),
                 uirevision="keep-zoom"
-            )
-            charts['branch_trends'] = json.dumps(fig_trends, cls=plotly.utils.PlotlyJSONEncoder)
+            ))
+            charts['branch_trends'] = fig_trends.to_plotly_json()
 
         # Placeholder jika semua kosong
         if not charts:
-            empty = go.Figure()
-            empty.add_annotation(text="Data sedang diproses, silakan refresh halaman",
-                                 xref="paper", yref="paper", x=0.5, y=0.5, showarrow=False,
-                                 font=dict(size=16, color="gray"))
-            empty.update_layout(height=300)
-            ph = json.dumps(empty, cls=plotly.utils.PlotlyJSONEncoder)
-            charts = {'daily_pattern': ph, 'branch_trends': ph, 'monthly_comparison': ph}
-
-        print("✅ Time charts built (ALL branches, hover single-trace)")
+            charts = dict.fromkeys(_TIME_CHART_KEYS, _PLACEHOLDER_CHART)
+
+        logger.debug("✅ Time charts built (ALL branches, hover single-trace)")
     except Exception as e:
-        print(f"❌ Time charts error: {e}")
-        print(traceback.format_exc())
-        empty = json.dumps({"data": [], "layout": {"title": "Chart tidak dapat dimuat"}})
-        charts = {'daily_pattern': empty, 'branch_trends': empty, 'monthly_comparison': empty}
+        logger.error("❌ Time charts error: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
+        charts = dict.fromkeys(_TIME_CHART_KEYS, _ERROR_CHART)
     return charts
 
 # ===== Error Handlers =====
 @app.errorhandler(404)
 def not_found_error(error):
-    print(f"❌ 404: {request.url}")
+    logger.error("❌ 404: %s", request.url)
     return render_template('error.html', error_code=404, error_message="Halaman tidak ditemukan"), 404
 
 @app.errorhandler(500)
 def internal_error(error):
-    print(f"❌ 500: {error}")
-    print(traceback.format_exc())
+    logger.error("❌ 500: %s", error, exc_info=logger.isEnabledFor(logging.DEBUG))
     return render_template('error.html', error_code=500, error_message="Terjadi kesalahan internal server"), 500
 
 @app.errorhandler(413)
 def too_large(error):
-    print("❌ 413: File too large")
+    logger.error("❌ 413: File too large")
     return render_template('error.html', error_code=413, error_message="File terlalu besar. Maksimal 10MB per file"), 413
 
 @app.errorhandler(Exception)
 def handle_exception(e):
-    print(f"❌ Unhandled: {e}")
-    print(traceback.format_exc())
+    logger.error("❌ Unhandled: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
     if "TemplateNotFound" in str(e):
         return f"Template not found: {str(e)}. Check templates folder.", 500
     return f"An error occurred: {str(e)}", 500
@@ -1,12 +1,70 @@
 import os
 import json
+import logging
+import threading
 from typing import Dict, Any
+import httpx
 from groq import Groq
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Muat file .env dari root
 load_dotenv(dotenv_path=".env")
 
+logger = logging.getLogger(__name__)
+
+def _rp(value) -> int:
+    """Nilai Rupiah dibulatkan ke integer (tanpa desimal di prompt)."""
+    try:
+        return int(round(float(value)))
+    except (TypeError, ValueError, OverflowError):
+        return 0
+
+
+def _pct(value) -> float:
+    """Persentase 1 desimal."""
+    try:
+        return round(float(value), 1)
+    except (TypeError, ValueError, OverflowError):
+        return 0.0
+
+
+def _json_default(obj):
+    # Skalar numpy (int64/float64) dari hasil agregasi pandas
+    return obj.item() if hasattr(obj, 'item') else str(obj)
+
+
+def _dumps_compact(obj) -> str:
+    """JSON tanpa spasi; orjson jika tersedia, fallback ke json standar."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_json_default)
+
+
+# Satu client Groq per proses: pool koneksi httpx (TCP/TLS keep-alive) dipakai ulang
+# oleh semua instance GroqChatbot dan semua request chat
+_GROQ_CLIENT = None
+_GROQ_CLIENT_LOCK = threading.Lock()
+
+
+def get_groq_client(api_key: str) -> Groq:
+    """Client Groq bersama, dibuat sekali per proses (thread-safe)."""
+    global _GROQ_CLIENT
+    if _GROQ_CLIENT is None:
+        with _GROQ_CLIENT_LOCK:
+            if _GROQ_CLIENT is None:
+                http_client = httpx.Client(
+                    timeout=httpx.Timeout(60.0, connect=10.0),
+                    limits=httpx.Limits(max_connections=10, max_keepalive_connections=10)
+                )
+                _GROQ_CLIENT = Groq(api_key=api_key, http_client=http_client)
+    return _GROQ_CLIENT
+
+
 class GroqChatbot:
     """
     Chatbot AI untuk analisis data sales restoran menggunakan Groq API.
@@ -19,17 +77,17 @@ class GroqChatbot:
         if not self.api_key or self.api_key.strip() == "":
             raise ValueError("❌ GROQ_API_KEY tidak ditemukan dalam file .env")
 
-        print(f"[DEBUG] GROQ_API_KEY loaded: {self.api_key[:6]}...")  # Jangan tampilkan seluruh API key di log
+        logger.debug("GROQ_API_KEY loaded: %s...", self.api_key[:6])  # Jangan tampilkan seluruh API key di log
 
-        self.client = Groq(api_key=self.api_key)
+        self.client = get_groq_client(self.api_key)
         # self.model = "mixtral-8x7b-32768"
         self.model = "llama3-70b-8192"
 
-
         self.system_prompt = """
         Anda adalah AI Data Analyst expert yang fokus pada analisis penjualan restoran dan COGS.
         Berikan analisis yang akurat, mendalam, dan menggunakan data yang tersedia.
         Gunakan bahasa Indonesia profesional, mudah dipahami, dan respons yang actionable.
+        Data penjualan diberikan sebagai JSON ringkas: nilai uang dalam Rupiah (integer), field *_pct dalam persen.
         """
 
     def get_response(self, user_question: str, data_context: Dict[str, Any]) -> str:
@@ -61,40 +119,102 @@ class GroqChatbot:
         Menyusun context prompt dari data penjualan.
         """
         try:
-            context = f"""
-📊 RINGKASAN SALES
-Periode: {data_context.get('period', 'N/A')}
-Revenue: Rp {data_context.get('total_revenue', 0):,.0f}
-COGS: Rp {data_context.get('total_cogs', 0):,.0f}
-Margin: Rp {data_context.get('total_margin', 0):,.0f}
-Avg COGS %: {data_context.get('avg_cogs_percentage', 0):.1f}%
-Gross Margin %: {(data_context.get('total_margin', 0) / max(data_context.get('total_revenue', 1), 1)) * 100:.1f}%
-Transaksi: {data_context.get('total_transactions', 0):,}
-Avg Revenue Harian: Rp {data_context.get('daily_average_revenue', 0):,.0f}
-Avg per Transaksi: Rp {(data_context.get('total_revenue', 0) / max(data_context.get('total_transactions', 1), 1)):,.0f}
-
-🏆 Top 5 Menu Terlaris:
-"""
-            for i, menu in enumerate(data_context.get("top_selling_menus", [])[:5], 1):
-                context += f"\n{i}. {menu.get('Menu', 'N/A')} - {menu.get('Total_Qty', 0)}x (Rp {menu.get('Total_Revenue', 0):,.0f})"
-
-            context += "\n\n💎 Menu Paling Menguntungkan:"
-            for i, menu in enumerate(data_context.get("most_profitable_menus", [])[:5], 1):
-                context += f"\n{i}. {menu.get('Menu', 'N/A')} - Rp {menu.get('Avg_Margin', 0):,.0f} ({menu.get('Margin_Percentage', 0):.1f}%)"
-
-            context += "\n\n📊 Performa Kategori Menu:"
-            for cat in data_context.get("category_performance", []):
-                revenue = cat.get("Total", 0)
-                margin = cat.get("Margin", 0)
-                margin_pct = (margin / revenue * 100) if revenue else 0
-                cogs_pct = cat.get("COGS Total (%)", 0)
-                context += f"\n- {cat.get('Menu Category', 'N/A')}: Revenue Rp {revenue:,.0f}, Margin {margin_pct:.1f}%, COGS {cogs_pct:.1f}%"
-
-            return context.strip()
+            if 'summary' in data_context:
+                return _dumps_compact(self._multi_branch_context(data_context))
+
+            revenue = data_context.get('total_revenue', 0)
+            margin = data_context.get('total_margin', 0)
+            transactions = data_context.get('total_transactions', 0)
+
+            context = {
+                'periode': data_context.get('period', 'N/A'),
+                'revenue': _rp(revenue),
+                'cogs': _rp(data_context.get('total_cogs', 0)),
+                'margin': _rp(margin),
+                'avg_cogs_pct': _pct(data_context.get('avg_cogs_percentage', 0)),
+                'gross_margin_pct': _pct(margin / max(revenue, 1) * 100),
+                'transaksi': transactions,
+                'avg_revenue_harian': _rp(data_context.get('daily_average_revenue', 0)),
+                'avg_per_transaksi': _rp(revenue / max(transactions, 1)),
+                'top_menu_terlaris': [
+                    {'menu': m.get('Menu', 'N/A'), 'qty': m.get('Total_Qty', 0), 'revenue': _rp(m.get('Total_Revenue', 0))}
+                    for m in data_context.get('top_selling_menus', [])[:5]
+                ],
+                'menu_paling_menguntungkan': [
+                    {'menu': m.get('Menu', 'N/A'), 'avg_margin': _rp(m.get('Avg_Margin', 0)), 'margin_pct': _pct(m.get('Margin_Percentage', 0))}
+                    for m in data_context.get('most_profitable_menus', [])[:5]
+                ],
+                'kategori': [
+                    {
+                        'kategori': cat.get('Menu Category', 'N/A'),
+                        'revenue': _rp(cat.get('Total', 0)),
+                        'margin_pct': _pct(cat.get('Margin', 0) / cat.get('Total', 0) * 100) if cat.get('Total', 0) else 0.0,
+                        'cogs_pct': _pct(cat.get('COGS Total (%)', 0))
+                    }
+                    for cat in data_context.get('category_performance', [])
+                ]
+            }
+
+            return _dumps_compact(context)
 
         except Exception as e:
             return f"❌ Error dalam membuat context prompt: {str(e)}"
 
+    @staticmethod
+    def _multi_branch_context(data_context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Context ringkas dari MultiBranchSalesAnalyzer.prepare_data_for_ai.
+        """
+        summary = data_context.get('summary') or {}
+        performance = data_context.get('branch_performance') or {}
+        insights = data_context.get('cross_branch_insights') or {}
+        concentration = insights.get('revenue_concentration') or {}
+        products = insights.get('product_consistency') or {}
+        cogs = insights.get('cogs_consistency') or {}
+
+        revenue = summary.get('total_revenue', 0)
+        margin = summary.get('total_margin', 0)
+        transactions = summary.get('total_transactions', 0)
+
+        def branch(key):
+            b = performance.get(key) or {}
+            return {'nama': b.get('name', 'N/A'), 'revenue': _rp(b.get('revenue', 0)), 'margin_pct': _pct(b.get('margin_pct', 0))}
+
+        return {
+            'periode': summary.get('date_range', 'N/A'),
+            'jumlah_cabang': summary.get('total_branches', 0),
+            'cabang': [str(name) for name in data_context.get('branch_list', [])],
+            'revenue': _rp(revenue),
+            'cogs': _rp(summary.get('total_cogs', 0)),
+            'margin': _rp(margin),
+            'avg_cogs_pct': _pct(summary.get('avg_cogs_percentage', 0)),
+            'gross_margin_pct': _pct(margin / max(revenue, 1) * 100),
+            'transaksi': transactions,
+            'avg_per_transaksi': _rp(summary.get('avg_transaction_value', revenue / max(transactions, 1))),
+            'produk_unik': summary.get('unique_products', 0),
+            'cabang_terbaik': branch('best_branch'),
+            'cabang_terlemah': branch('worst_branch'),
+            'top_produk': [
+                {'menu': str(p.get('Menu', 'N/A')), 'qty': p.get('Qty', 0), 'revenue': _rp(p.get('Total', 0)), 'margin': _rp(p.get('Margin', 0))}
+                for p in data_context.get('top_products_overall', [])[:5]
+            ],
+            'konsentrasi_revenue': {
+                'top3_cabang_pct': _pct(concentration.get('top_3_branches_share', 0)),
+                'bottom3_cabang_pct': _pct(concentration.get('bottom_3_branches_share', 0)),
+                'ketimpangan_revenue_pct': _pct(concentration.get('revenue_inequality', 0) * 100)
+            },
+            'konsistensi_produk': {
+                'produk_di_semua_cabang': products.get('universal_products', 0),
+                'produk_di_kurang_dari_separuh_cabang': products.get('limited_products', 0),
+                'avg_ketersediaan_pct': _pct(products.get('avg_availability', 0))
+            },
+            'konsistensi_cogs': {
+                'produk_variansi_tinggi': cogs.get('high_variance_products', 0),
+                'avg_variasi_cogs_pct': _pct(cogs.get('avg_cogs_variance', 0) * 100),
+                'cogs_paling_konsisten': cogs.get('most_consistent_cogs')
+            }
+        }
+
     def validate_api_connection(self) -> bool:
         """
         Validasi apakah koneksi ke Groq API berhasil.
@@ -107,5 +227,5 @@ Avg per Transaksi: Rp {(data_context.get('total_revenue', 0) / max(data_context.
             )
             return True
         except Exception as e:
-            print(f"❌ Gagal konek ke Groq API: {str(e)}")
+            logger.error("❌ Gagal konek ke Groq API: %s", e)
             return False
\ No newline at end of file
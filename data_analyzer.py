@@ -1,9 +1,31 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from functools import cached_property
 import warnings
 warnings.filterwarnings('ignore')
 
+# Urutan hari (Senin = 0, sama dengan dt.dayofweek) untuk Day_of_Week ordered Categorical
+DAY_ORDER = np.array(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'])
+
+def percentage(numerator, denominator):
+    """
+    numerator / denominator * 100 per elemen; 0 jika penyebut 0 (tanpa inf/NaN).
+    
+    Args:
+        numerator: Series/array pembilang
+        denominator: Series/array penyebut
+        
+    Returns:
+        np.ndarray: Persentase float64
+    """
+    num = np.asarray(numerator, dtype=float)
+    den = np.asarray(denominator, dtype=float)
+    out = np.zeros_like(num)
+    np.divide(num, den, out=out, where=den != 0)
+    out *= 100.0
+    return out
+
 class SalesDataAnalyzer:
     """
     Kelas untuk menganalisis data sales menu COGS secara mendalam.
@@ -16,6 +38,9 @@ class SalesDataAnalyzer:
     - Rekomendasi bisnis berbasis data
     """
     
+    # Groupby di-cache hanya untuk 2 DataFrame terakhir (mis. data penuh + hasil filter terakhir)
+    _GROUPER_FRAMES_MAX = 2
+    
     def __init__(self, uploaded_file):
         """
         Inisialisasi analyzer dengan file upload.
@@ -25,9 +50,10 @@ class SalesDataAnalyzer:
         """
         self.raw_data = self._load_data(uploaded_file)
         self.data = self._clean_and_prepare_data(self.raw_data)
-        self.total_records = len(self.data)
-        self.min_date = self.data['Sales Date'].min()
-        self.max_date = self.data['Sales Date'].max()
+        # Cache objek groupby: [(DataFrame, {kunci: groupby})], terbaru di depan
+        self._groupers = []
+        # Ringkasan agregat terakhir per nama: {nama: (data, hasil)}, dipakai bersama antar view
+        self._summaries = {}
     
     def _load_data(self, uploaded_file):
         """
@@ -40,29 +66,45 @@ class SalesDataAnalyzer:
             pd.DataFrame: Data mentah dari Excel
         """
         try:
-            # Baca file Excel
-            df = pd.read_excel(uploaded_file)
+            # Baca file Excel SEKALI tanpa header; baris header dicari di memori
+            raw = pd.read_excel(uploaded_file, header=None)
             
             # Cari row yang berisi header sebenarnya
-            for i in range(20):  # Cek 20 baris pertama
-                try:
-                    # Coba parse dari baris ke-i
-                    test_df = pd.read_excel(uploaded_file, header=i)
-                    
-                    # Cek apakah ini adalah header yang benar
-                    if ('Sales Number' in test_df.columns and 
-                        'Menu' in test_df.columns and 
-                        'COGS Total' in test_df.columns):
-                        return test_df
-                except:
-                    continue
-            
-            # Jika tidak ditemukan, gunakan default
-            return df
+            header_row = 0  # Jika tidak ditemukan, gunakan default (baris pertama)
+            for i in range(min(20, len(raw))):  # Cek 20 baris pertama
+                row = set(raw.iloc[i].tolist())
+                
+                # Cek apakah ini adalah header yang benar
+                if {'Sales Number', 'Menu', 'COGS Total'} <= row:
+                    header_row = i
+                    break
+            
+            return self._promote_header(raw, header_row)
             
         except Exception as e:
             raise Exception(f"Error loading data: {str(e)}")
     
+    @staticmethod
+    def _promote_header(raw, header_row):
+        """
+        Menjadikan baris header_row sebagai nama kolom, seperti read_excel(header=header_row).
+        
+        Args:
+            raw: DataFrame hasil read_excel(header=None)
+            header_row: Index baris header
+            
+        Returns:
+            pd.DataFrame: Data di bawah baris header
+        """
+        columns = [
+            name if pd.notna(name) else f'Unnamed: {j}'
+            for j, name in enumerate(raw.iloc[header_row].tolist())
+        ] if len(raw) else list(raw.columns)
+        df = raw.iloc[header_row + 1:].reset_index(drop=True)
+        df.columns = columns
+        # Tipe kolom diinfer ulang tanpa baris judul di atasnya (mis. Sales Date -> datetime64)
+        return df.infer_objects()
+    
     def _clean_and_prepare_data(self, df):
         """
         Membersihkan dan mempersiapkan data untuk analisis.
@@ -73,14 +115,13 @@ class SalesDataAnalyzer:
         Returns:
             pd.DataFrame: Data yang sudah dibersihkan
         """
-        # Copy data
-        data = df.copy()
-        
-        # Hapus baris yang kosong atau tidak valid
-        data = data.dropna(subset=['Menu', 'Sales Date'])
+        # Hapus baris yang kosong atau tidak valid (dropna sudah menghasilkan frame baru,
+        # raw_data tidak ikut berubah sehingga copy awal tidak diperlukan)
+        data = df.dropna(subset=['Menu', 'Sales Date'])
         
         # Konversi tipe data
-        if 'Sales Date' in data.columns:
+        # (read_excel biasanya sudah memberi datetime64; parse hanya jika belum)
+        if 'Sales Date' in data.columns and not pd.api.types.is_datetime64_any_dtype(data['Sales Date']):
             data['Sales Date'] = pd.to_datetime(data['Sales Date'])
         
         # Pastikan kolom numerik dalam format yang benar
@@ -92,35 +133,240 @@ class SalesDataAnalyzer:
         # Hapus baris dengan nilai numerik yang tidak valid
         data = data.dropna(subset=numeric_columns)
         
+        # Downcast kolom yang tidak butuh presisi float64: Qty ke int32 (jika bulat; minimal int32
+        # agar hasil agregasi tetap lebar), persentase COGS ke float32.
+        # Nominal Rupiah tetap float64 karena total ditampilkan per rupiah.
+        if 'Qty' in data.columns:
+            qty = pd.to_numeric(data['Qty'], downcast='integer')
+            if pd.api.types.is_integer_dtype(qty) and qty.dtype.itemsize < 4:
+                qty = qty.astype(np.int32)
+            data['Qty'] = qty
+        if 'COGS Total (%)' in data.columns:
+            data['COGS Total (%)'] = data['COGS Total (%)'].astype(np.float32)
+        
         # Tambah kolom analisis tambahan
         data['Hour'] = data['Sales Date'].dt.hour
-        data['Day_of_Week'] = data['Sales Date'].dt.day_name()
+        # Kode kategori = dayofweek, urutan Senin..Minggu tanpa map per baris
+        data['Day_of_Week'] = pd.Categorical.from_codes(
+            data['Sales Date'].dt.dayofweek.to_numpy(), categories=DAY_ORDER, ordered=True
+        )
         data['Week'] = data['Sales Date'].dt.isocalendar().week
         data['Month'] = data['Sales Date'].dt.month
-        data['Date'] = data['Sales Date'].dt.date
+        # Tanggal sebagai datetime64 tengah malam (int64 di memori), bukan objek datetime.date per baris
+        data['Date'] = data['Sales Date'].dt.normalize()
+        
+        # Kolom teks berulang sebagai Categorical: groupby/isin bekerja atas kode integer
+        for col in ('Menu', 'Menu Category', 'Branch'):
+            if col in data.columns:
+                data[col] = data[col].astype('category')
         
         # Kalkulasi margin percentage jika belum ada
         if 'Margin_Percentage' not in data.columns:
-            data['Margin_Percentage'] = (data['Margin'] / data['Total']) * 100
+            data['Margin_Percentage'] = percentage(data['Margin'], data['Total'])
         
         return data
     
-    def get_date_range(self):
-        """Mendapatkan rentang tanggal data."""
+    def _grouper(self, data, keys):
+        """
+        Objek groupby yang dipakai ulang untuk DataFrame dan kunci yang sama.
+        
+        Args:
+            data: DataFrame yang akan dianalisis
+            keys: Nama kolom atau list kolom untuk groupby
+            
+        Returns:
+            DataFrameGroupBy: Groupby (urut per kunci, observed=True)
+        """
+        key = tuple(keys) if isinstance(keys, list) else keys
+        for i, (frame, groupers) in enumerate(self._groupers):
+            if frame is data:
+                if i:  # jadikan terbaru
+                    self._groupers.insert(0, self._groupers.pop(i))
+                break
+        else:
+            # DataFrame baru: frame paling lama dilepas agar salinan hasil filter tidak tertahan
+            groupers = {}
+            self._groupers.insert(0, (data, groupers))
+            del self._groupers[self._GROUPER_FRAMES_MAX:]
+        
+        grouper = groupers.get(key)
+        if grouper is None:
+            grouper = groupers[key] = data.groupby(keys, observed=True)
+        return grouper
+    
+    def _group_mean64(self, data, keys, col):
+        """
+        Rata-rata kolom per grup dengan akumulasi float64, agar kolom float32
+        (mis. 'COGS Total (%)') tidak membawa pembulatan float32 ke hasil.
+        
+        Args:
+            data: DataFrame yang akan dianalisis
+            keys: Nama kolom atau list kolom untuk groupby
+            col: Kolom numerik yang dirata-rata
+            
+        Returns:
+            pd.Series: Rata-rata float64, indeks dan urutan sama dengan groupby(keys)
+        """
+        grouper = self._grouper(data, keys)
+        counts = grouper.size()
+        codes = grouper.ngroup().to_numpy()
+        valid = codes >= 0
+        sums = np.bincount(codes[valid], weights=data[col].to_numpy(dtype=np.float64)[valid], minlength=len(counts))
+        return pd.Series(sums / counts.to_numpy(), index=counts.index, name=col)
+    
+    def _summary(self, name, data, build):
+        """
+        Hasil build(data) yang disimpan per nama selama DataFrame-nya sama.
+        
+        Args:
+            name: Nama ringkasan
+            data: DataFrame yang akan dianalisis
+            build: Fungsi pembentuk ringkasan dari data
+            
+        Returns:
+            pd.DataFrame: Ringkasan (jangan diubah in-place oleh pemanggil)
+        """
+        entry = self._summaries.get(name)
+        if entry is not None and entry[0] is data:
+            return entry[1]
+        
+        summary = build(data)
+        self._summaries[name] = (data, summary)
+        return summary
+    
+    def _group_codes(self, data, key):
+        """Kode grup terurut (pd.factorize sort=True) satu kolom kunci, di-cache per DataFrame."""
+        return self._summary(('codes', key), data, lambda d: pd.factorize(d[key], sort=True))
+    
+    def _group_agg(self, data, key, spec):
+        """
+        Agregasi satu kunci (sum/mean/count) dengan np.bincount atas kode grup,
+        setara groupby(key).agg(...).reset_index() untuk kolom numerik tanpa NaN.
+        
+        Args:
+            data: DataFrame yang akan dianalisis
+            key: Kolom kunci grup
+            spec: List (nama_output, kolom, 'sum' | 'mean' | 'count')
+            
+        Returns:
+            pd.DataFrame: Kolom key lalu kolom output sesuai urutan spec, urut per kunci
+        """
+        codes, uniques = self._group_codes(data, key)
+        valid = codes >= 0
+        if not valid.all():  # kunci NaN tidak ikut, seperti groupby
+            codes = codes[valid]
+        n = len(uniques)
+        counts = np.bincount(codes, minlength=n)
+        
+        result = {key: uniques}
+        for name, col, func in spec:
+            if func == 'count':
+                result[name] = counts
+                continue
+            values = data[col].to_numpy()
+            if not valid.all():
+                values = values[valid]
+            sums = np.bincount(codes, weights=values.astype(float, copy=False), minlength=n)
+            if func == 'mean':
+                result[name] = sums / counts
+            elif np.issubdtype(values.dtype, np.integer):
+                result[name] = sums.astype(np.int64)  # sum kolom integer tetap integer
+            else:
+                result[name] = sums
+        return pd.DataFrame(result)
+    
+    def _count_days(self, data):
+        """Jumlah hari unik; dari kode grup 'Date' yang juga dipakai tren harian."""
+        return len(self._group_codes(data, 'Date')[1])
+    
+    # Atribut turunan data yang tidak berubah: dihitung saat pertama diakses, lalu disimpan
+    @cached_property
+    def total_records(self):
+        return len(self.data)
+    
+    @cached_property
+    def _sales_day(self):
+        # Kolom Date (datetime64) sebagai array untuk filter tanggal di apply_filters
+        return self.data['Date'].to_numpy()
+    
+    @cached_property
+    def min_date(self):
+        return self.data['Sales Date'].min()
+    
+    @cached_property
+    def max_date(self):
+        return self.data['Sales Date'].max()
+    
+    @cached_property
+    def date_range_str(self):
+        """Rentang tanggal data, format dd/mm/YYYY - dd/mm/YYYY."""
         start_date = self.min_date.strftime('%d/%m/%Y')
         end_date = self.max_date.strftime('%d/%m/%Y')
         return f"{start_date} - {end_date}"
     
-    def get_unique_categories(self):
-        """Mendapatkan daftar kategori menu unik."""
+    @cached_property
+    def unique_categories(self):
+        """Daftar kategori menu unik (terurut)."""
         return sorted(self.data['Menu Category'].unique().tolist())
     
-    def get_unique_branches(self):
-        """Mendapatkan daftar cabang unik."""
+    @cached_property
+    def unique_branches(self):
+        """Daftar cabang unik (terurut)."""
         if 'Branch' in self.data.columns:
             return sorted(self.data['Branch'].unique().tolist())
         return []
     
+    @staticmethod
+    def _trailing_mean(values, window):
+        """
+        Rata-rata bergerak ke belakang (setara rolling(window, min_periods=1).mean())
+        lewat selisih cumsum.
+        
+        Args:
+            values: ndarray float 1-D
+            window: Panjang jendela
+            
+        Returns:
+            np.ndarray: Moving average dengan panjang yang sama
+        """
+        csum = np.cumsum(values)
+        out = np.empty_like(csum)
+        head = min(window, len(values))
+        out[:head] = csum[:head] / np.arange(1, head + 1)
+        out[head:] = (csum[window:] - csum[:-window]) / window
+        return out
+    
+    def get_date_range(self):
+        """Mendapatkan rentang tanggal data."""
+        return self.date_range_str
+    
+    def get_unique_categories(self):
+        """Mendapatkan daftar kategori menu unik."""
+        return list(self.unique_categories)
+    
+    def get_unique_branches(self):
+        """Mendapatkan daftar cabang unik."""
+        return list(self.unique_branches)
+    
+    @staticmethod
+    def _category_mask(column, values):
+        """
+        Mask keanggotaan values pada kolom; untuk Categorical dibandingkan lewat kode integer.
+        
+        Args:
+            column: Series (Categorical atau biasa)
+            values: List nilai yang dicari
+            
+        Returns:
+            np.ndarray: Boolean mask
+        """
+        values = list(values)
+        # Nilai kosong (NaN) bukan kategori (kode -1): tetap lewat isin
+        if isinstance(column.dtype, pd.CategoricalDtype) and not pd.isna(values).any():
+            wanted = column.cat.categories.get_indexer(values)
+            return np.isin(column.cat.codes.to_numpy(), wanted[wanted >= 0])
+        return column.isin(values).to_numpy()
+    
     def apply_filters(self, date_range, categories, branch=None):
         """
         Menerapkan filter pada data.
@@ -133,25 +379,50 @@ class SalesDataAnalyzer:
         Returns:
             pd.DataFrame: Data yang sudah difilter
         """
-        filtered_data = self.data.copy()
+        # Semua filter digabung ke satu mask, data di-slice sekali
+        mask = np.ones(len(self.data), dtype=bool)
         
         # Filter tanggal
         if len(date_range) == 2:
             start_date, end_date = date_range
-            filtered_data = filtered_data[
-                (filtered_data['Sales Date'].dt.date >= start_date) &
-                (filtered_data['Sales Date'].dt.date <= end_date)
-            ]
+            mask &= (self._sales_day >= np.datetime64(start_date)) & (self._sales_day <= np.datetime64(end_date))
         
         # Filter kategori
         if categories:
-            filtered_data = filtered_data[filtered_data['Menu Category'].isin(categories)]
+            mask &= self._category_mask(self.data['Menu Category'], categories)
         
         # Filter cabang
-        if branch and 'Branch' in filtered_data.columns:
-            filtered_data = filtered_data[filtered_data['Branch'] == branch]
+        if branch and 'Branch' in self.data.columns:
+            mask &= self._category_mask(self.data['Branch'], [branch])
+        
+        return self.data[mask]
+    
+    def _get_menu_summary(self, data):
+        """
+        Satu agregasi per menu untuk semua view Top-N (terlaris, paling menguntungkan, COGS).
+        View memanggil nlargest/nsmallest langsung pada ringkasan ini lalu memilih kolom,
+        sehingga hanya baris Top-N yang disalin.
         
-        return filtered_data
+        Args:
+            data: DataFrame yang akan dianalisis
+            
+        Returns:
+            pd.DataFrame: Total_Qty, Total_Revenue, Total_Margin, Avg_Margin, Total_COGS, Avg_COGS_Pct per menu
+        """
+        def build(data):
+            summary = self._grouper(data, 'Menu').agg({
+                'Qty': 'sum',
+                'Total': 'sum',
+                'Margin': ['sum', 'mean'],
+                'COGS Total': 'sum'
+            }).reset_index()
+            
+            # Flatten column names
+            summary.columns = ['Menu', 'Total_Qty', 'Total_Revenue', 'Total_Margin', 'Avg_Margin', 'Total_COGS']
+            summary['Avg_COGS_Pct'] = self._group_mean64(data, 'Menu', 'COGS Total (%)').to_numpy()
+            return summary
+        
+        return self._summary('menu', data, build)
     
     def get_top_performing_menus(self, data, top_n=10):
         """
@@ -164,18 +435,14 @@ class SalesDataAnalyzer:
         Returns:
             pd.DataFrame: Top performing menus
         """
-        menu_performance = data.groupby('Menu').agg({
-            'Qty': 'sum',
-            'Total': 'sum',
-            'Margin': 'sum',
-            'COGS Total': 'sum'
-        }).reset_index()
+        columns = ['Menu', 'Total_Qty', 'Total_Revenue', 'Total_Margin', 'Total_COGS']
+        menu_performance = self._get_menu_summary(data).nlargest(top_n, 'Total_Qty', keep='first')[columns]
         
-        menu_performance.columns = ['Menu', 'Total_Qty', 'Total_Revenue', 'Total_Margin', 'Total_COGS']
+        # Kolom turunan cukup dihitung untuk baris Top-N
         menu_performance['Avg_Price'] = menu_performance['Total_Revenue'] / menu_performance['Total_Qty']
-        menu_performance['Margin_Percentage'] = (menu_performance['Total_Margin'] / menu_performance['Total_Revenue']) * 100
+        menu_performance['Margin_Percentage'] = percentage(menu_performance['Total_Margin'], menu_performance['Total_Revenue'])
         
-        return menu_performance.nlargest(top_n, 'Total_Qty')
+        return menu_performance
     
     def get_most_profitable_menus(self, data, top_n=10):
         """
@@ -188,18 +455,44 @@ class SalesDataAnalyzer:
         Returns:
             pd.DataFrame: Most profitable menus
         """
-        menu_profit = data.groupby('Menu').agg({
-            'Margin': ['sum', 'mean'],
-            'Total': 'sum',
-            'Qty': 'sum',
-            'COGS Total (%)': 'mean'
-        }).reset_index()
+        columns = ['Menu', 'Total_Margin', 'Avg_Margin', 'Total_Revenue', 'Total_Qty', 'Avg_COGS_Pct']
+        menu_profit = self._get_menu_summary(data).nlargest(top_n, 'Avg_Margin', keep='first')[columns]
+        menu_profit['Margin_Percentage'] = percentage(menu_profit['Total_Margin'], menu_profit['Total_Revenue'])
         
-        # Flatten column names
-        menu_profit.columns = ['Menu', 'Total_Margin', 'Avg_Margin', 'Total_Revenue', 'Total_Qty', 'Avg_COGS_Pct']
-        menu_profit['Margin_Percentage'] = (menu_profit['Total_Margin'] / menu_profit['Total_Revenue']) * 100
+        return menu_profit
+    
+    def _get_menu_category_summary(self, data):
+        """
+        Satu agregasi per (Menu, Menu Category) untuk analisis komprehensif dan profitabilitas.
         
-        return menu_profit.nlargest(top_n, 'Avg_Margin')
+        Args:
+            data: DataFrame yang akan dianalisis
+            
+        Returns:
+            pd.DataFrame: Statistik dasar per menu dan kategori
+        """
+        def build(data):
+            summary = self._grouper(data, ['Menu', 'Menu Category']).agg({
+                'Qty': ['sum', 'mean', 'count'],
+                'Total': ['sum', 'mean'],
+                'Margin': ['sum', 'mean'],
+                'COGS Total': ['sum', 'mean'],
+                'Price': 'mean'
+            }).reset_index()
+            
+            # Flatten column names
+            summary.columns = [
+                'Menu', 'Menu_Category', 'Total_Qty', 'Avg_Qty', 'Order_Count',
+                'Total_Revenue', 'Avg_Revenue', 'Total_Margin', 'Avg_Margin',
+                'Total_COGS', 'Avg_COGS', 'Avg_Price'
+            ]
+            summary.insert(
+                summary.columns.get_loc('Avg_Price'), 'Avg_COGS_Pct',
+                self._group_mean64(data, ['Menu', 'Menu Category'], 'COGS Total (%)').to_numpy()
+            )
+            return summary
+        
+        return self._summary('menu_category', data, build)
     
     def get_comprehensive_menu_analysis(self, data):
         """
@@ -211,26 +504,14 @@ class SalesDataAnalyzer:
         Returns:
             pd.DataFrame: Analisis komprehensif menu
         """
-        menu_analysis = data.groupby(['Menu', 'Menu Category']).agg({
-            'Qty': ['sum', 'mean', 'count'],
-            'Total': ['sum', 'mean'],
-            'Margin': ['sum', 'mean'],
-            'COGS Total': ['sum', 'mean'],
-            'COGS Total (%)': 'mean',
-            'Price': 'mean'
-        }).reset_index()
-        
-        # Flatten column names
-        menu_analysis.columns = [
-            'Menu', 'Menu_Category', 'Total_Qty', 'Avg_Qty', 'Order_Count',
-            'Total_Revenue', 'Avg_Revenue', 'Total_Margin', 'Avg_Margin',
-            'Total_COGS', 'Avg_COGS', 'Avg_COGS_Pct', 'Avg_Price'
-        ]
-        
-        # Tambah kalkulasi tambahan
-        menu_analysis['Margin_Percentage'] = (menu_analysis['Total_Margin'] / menu_analysis['Total_Revenue']) * 100
-        menu_analysis['Revenue_per_Order'] = menu_analysis['Total_Revenue'] / menu_analysis['Order_Count']
-        menu_analysis['Frequency_Score'] = menu_analysis['Order_Count'] / data['Date'].nunique()  # Orders per day
+        menu_analysis = self._get_menu_category_summary(data)
+        
+        # Tambah kalkulasi tambahan (assign: ringkasan cache tidak ikut berubah)
+        menu_analysis = menu_analysis.assign(
+            Margin_Percentage=percentage(menu_analysis['Total_Margin'], menu_analysis['Total_Revenue']),
+            Revenue_per_Order=menu_analysis['Total_Revenue'] / menu_analysis['Order_Count'],
+            Frequency_Score=menu_analysis['Order_Count'] / self._count_days(data)  # Orders per day
+        )
         
         return menu_analysis.sort_values('Total_Revenue', ascending=False)
     
@@ -244,20 +525,21 @@ class SalesDataAnalyzer:
         Returns:
             pd.DataFrame: Daily sales trend
         """
-        daily_trend = data.groupby('Date').agg({
-            'Total': 'sum',
-            'Qty': 'sum',
-            'Margin': 'sum',
-            'COGS Total': 'sum'
-        }).reset_index()
+        daily_trend = self._group_agg(data, 'Date', [
+            ('Daily_Revenue', 'Total', 'sum'),
+            ('Daily_Qty', 'Qty', 'sum'),
+            ('Daily_Margin', 'Margin', 'sum'),
+            ('Daily_COGS', 'COGS Total', 'sum')
+        ])
         
-        daily_trend.columns = ['Sales Date', 'Daily_Revenue', 'Daily_Qty', 'Daily_Margin', 'Daily_COGS']
-        daily_trend['Sales Date'] = pd.to_datetime(daily_trend['Sales Date'])
+        # Kunci Date sudah datetime64, tidak perlu pd.to_datetime lagi
+        daily_trend = daily_trend.rename(columns={'Date': 'Sales Date'})
         
         # Tambah moving average
-        daily_trend['Revenue_MA_7'] = daily_trend['Daily_Revenue'].rolling(window=7, min_periods=1).mean()
+        daily_trend['Revenue_MA_7'] = self._trailing_mean(daily_trend['Daily_Revenue'].to_numpy(dtype=float), 7)
         
-        return daily_trend.sort_values('Sales Date')
+        # Kode grup sudah terurut per tanggal
+        return daily_trend
     
     def get_hourly_sales_pattern(self, data):
         """
@@ -269,14 +551,15 @@ class SalesDataAnalyzer:
         Returns:
             pd.DataFrame: Hourly sales pattern
         """
-        hourly_pattern = data.groupby('Hour').agg({
-            'Total': ['sum', 'mean', 'count'],
-            'Qty': 'sum'
-        }).reset_index()
-        
-        hourly_pattern.columns = ['Hour', 'Total_Revenue', 'Avg_Revenue', 'Transaction_Count', 'Total_Qty']
+        hourly_pattern = self._group_agg(data, 'Hour', [
+            ('Total_Revenue', 'Total', 'sum'),
+            ('Avg_Revenue', 'Total', 'mean'),
+            ('Transaction_Count', 'Total', 'count'),
+            ('Total_Qty', 'Qty', 'sum')
+        ])
         
-        return hourly_pattern.sort_values('Hour')
+        # Kode grup sudah terurut per jam
+        return hourly_pattern
     
     def get_daily_sales_pattern(self, data):
         """
@@ -288,19 +571,23 @@ class SalesDataAnalyzer:
         Returns:
             pd.DataFrame: Daily sales pattern
         """
-        # Map day names to numbers for proper ordering
-        day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        
-        daily_pattern = data.groupby('Day_of_Week').agg({
-            'Total': ['sum', 'mean'],
-            'Qty': 'sum'
-        }).reset_index()
-        
-        daily_pattern.columns = ['Day_Name', 'Total_Revenue', 'Avg_Revenue', 'Total_Qty']
-        
-        # Reorder by day of week
-        daily_pattern['Day_Order'] = daily_pattern['Day_Name'].map({day: i for i, day in enumerate(day_order)})
-        daily_pattern = daily_pattern.sort_values('Day_Order').drop('Day_Order', axis=1)
+        # Maksimal 7 bucket: kode Day_of_Week (Senin = 0) langsung jadi indeks bincount
+        day_idx = data['Day_of_Week'].cat.codes.to_numpy()
+        counts = np.bincount(day_idx, minlength=7)
+        revenue = np.bincount(day_idx, weights=data['Total'].to_numpy(dtype=float), minlength=7)
+        # Qty dijumlah dengan dtype aslinya (integer tetap integer, seperti groupby sum)
+        qty_values = data['Qty'].to_numpy()
+        qty = np.zeros(7, dtype=np.result_type(qty_values, np.int64))
+        np.add.at(qty, day_idx, qty_values)
+        
+        # Hanya hari yang memiliki transaksi, seperti hasil groupby
+        present = counts > 0
+        daily_pattern = pd.DataFrame({
+            'Day_Name': DAY_ORDER[present],
+            'Total_Revenue': revenue[present],
+            'Avg_Revenue': revenue[present] / counts[present],
+            'Total_Qty': qty[present]
+        })
         
         return daily_pattern
     
@@ -314,15 +601,14 @@ class SalesDataAnalyzer:
         Returns:
             pd.DataFrame: Weekly trend
         """
-        weekly_trend = data.groupby('Week').agg({
-            'Total': 'sum',
-            'Qty': 'sum',
-            'Margin': 'sum'
-        }).reset_index()
+        weekly_trend = self._group_agg(data, 'Week', [
+            ('Weekly_Revenue', 'Total', 'sum'),
+            ('Weekly_Qty', 'Qty', 'sum'),
+            ('Weekly_Margin', 'Margin', 'sum')
+        ])
         
-        weekly_trend.columns = ['Week', 'Weekly_Revenue', 'Weekly_Qty', 'Weekly_Margin']
-        
-        return weekly_trend.sort_values('Week')
+        # Kode grup sudah terurut per minggu
+        return weekly_trend
     
     def get_sales_heatmap_data(self, data):
         """
@@ -334,13 +620,20 @@ class SalesDataAnalyzer:
         Returns:
             pd.DataFrame: Heatmap data
         """
-        heatmap_data = data.groupby(['Hour', 'Day_of_Week'])['Total'].sum().reset_index()
-        heatmap_pivot = heatmap_data.pivot(index='Hour', columns='Day_of_Week', values='Total').fillna(0)
-        
-        # Reorder columns by day of week
-        day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        available_days = [day for day in day_order if day in heatmap_pivot.columns]
-        heatmap_pivot = heatmap_pivot[available_days]
+        # Matriks jam x hari diisi langsung: kode jam (terurut) x hari (Senin = 0),
+        # satu bincount atas indeks datar menggantikan groupby + pivot + fillna
+        hour_idx, hours = pd.factorize(data['Hour'], sort=True)
+        day_idx = data['Day_of_Week'].cat.codes.to_numpy()
+        flat = hour_idx * 7 + day_idx
+        totals = np.bincount(flat, weights=data['Total'].to_numpy(dtype=float), minlength=len(hours) * 7)
+        present = np.bincount(day_idx, minlength=7) > 0
+        
+        # Hanya hari yang memiliki transaksi, urut Senin..Minggu
+        heatmap_pivot = pd.DataFrame(
+            totals.reshape(len(hours), 7)[:, present],
+            index=pd.Index(hours, name='Hour'),
+            columns=pd.Index(DAY_ORDER[present], name='Day_of_Week')
+        )
         
         return heatmap_pivot
     
@@ -354,15 +647,18 @@ class SalesDataAnalyzer:
         Returns:
             pd.DataFrame: Menu profitability analysis
         """
-        menu_profit = data.groupby(['Menu', 'Menu Category']).agg({
-            'Total': 'sum',
-            'Margin': 'sum',
-            'COGS Total': 'sum',
-            'COGS Total (%)': 'mean',
-            'Qty': 'sum'
-        }).reset_index()
+        summary = self._get_menu_category_summary(data)
+        menu_profit = pd.DataFrame({
+            'Menu': summary['Menu'],
+            'Menu Category': summary['Menu_Category'],
+            'Total': summary['Total_Revenue'],
+            'Margin': summary['Total_Margin'],
+            'COGS Total': summary['Total_COGS'],
+            'COGS Total (%)': summary['Avg_COGS_Pct'],
+            'Qty': summary['Total_Qty']
+        })
         
-        menu_profit['Margin_Percentage'] = (menu_profit['Margin'] / menu_profit['Total']) * 100
+        menu_profit['Margin_Percentage'] = percentage(menu_profit['Margin'], menu_profit['Total'])
         menu_profit['Avg_COGS_Pct'] = menu_profit['COGS Total (%)']
         menu_profit['Total_Margin'] = menu_profit['Margin']
         menu_profit['Total_Qty'] = menu_profit['Qty']
@@ -379,17 +675,18 @@ class SalesDataAnalyzer:
         Returns:
             pd.DataFrame: COGS trend
         """
-        cogs_trend = data.groupby('Date').agg({
-            'COGS Total': 'sum',
-            'Total': 'sum',
-            'COGS Total (%)': 'mean'
-        }).reset_index()
+        cogs_trend = self._group_agg(data, 'Date', [
+            ('Daily_COGS', 'COGS Total', 'sum'),
+            ('Daily_Revenue', 'Total', 'sum'),
+            ('Avg_COGS_Pct', 'COGS Total (%)', 'mean')
+        ])
         
-        cogs_trend.columns = ['Sales Date', 'Daily_COGS', 'Daily_Revenue', 'Avg_COGS_Pct']
-        cogs_trend['Sales Date'] = pd.to_datetime(cogs_trend['Sales Date'])
+        # Kunci Date sudah datetime64, tidak perlu pd.to_datetime lagi
+        cogs_trend = cogs_trend.rename(columns={'Date': 'Sales Date'})
         cogs_trend['COGS_Efficiency'] = (1 - cogs_trend['Avg_COGS_Pct'] / 100) * 100
         
-        return cogs_trend.sort_values('Sales Date')
+        # Kode grup sudah terurut per tanggal
+        return cogs_trend
     
     def get_high_cogs_menus(self, data, top_n=10):
         """
@@ -402,15 +699,7 @@ class SalesDataAnalyzer:
         Returns:
             pd.DataFrame: High COGS menus
         """
-        high_cogs = data.groupby('Menu').agg({
-            'COGS Total (%)': 'mean',
-            'Total': 'sum',
-            'Qty': 'sum'
-        }).reset_index()
-        
-        high_cogs.columns = ['Menu', 'Avg_COGS_Pct', 'Total_Revenue', 'Total_Qty']
-        
-        return high_cogs.nlargest(top_n, 'Avg_COGS_Pct')
+        return self._get_menu_summary(data).nlargest(top_n, 'Avg_COGS_Pct', keep='first')[['Menu', 'Avg_COGS_Pct', 'Total_Revenue', 'Total_Qty']]
     
     def get_low_cogs_menus(self, data, top_n=10):
         """
@@ -423,15 +712,7 @@ class SalesDataAnalyzer:
         Returns:
             pd.DataFrame: Low COGS menus
         """
-        low_cogs = data.groupby('Menu').agg({
-            'COGS Total (%)': 'mean',
-            'Total': 'sum',
-            'Qty': 'sum'
-        }).reset_index()
-        
-        low_cogs.columns = ['Menu', 'Avg_COGS_Pct', 'Total_Revenue', 'Total_Qty']
-        
-        return low_cogs.nsmallest(top_n, 'Avg_COGS_Pct')
+        return self._get_menu_summary(data).nsmallest(top_n, 'Avg_COGS_Pct', keep='first')[['Menu', 'Avg_COGS_Pct', 'Total_Revenue', 'Total_Qty']]
     
     def calculate_cogs_efficiency(self, data):
         """
@@ -476,7 +757,7 @@ class SalesDataAnalyzer:
             })
         
         # Analisis kategori dengan COGS tinggi
-        category_cogs = data.groupby('Menu Category')['COGS Total (%)'].mean().sort_values(ascending=False)
+        category_cogs = self._group_mean64(data, 'Menu Category', 'COGS Total (%)').sort_values(ascending=False)
         if not category_cogs.empty:
             worst_category = category_cogs.index[0]
             worst_cogs_pct = category_cogs.iloc[0]
@@ -488,15 +769,17 @@ class SalesDataAnalyzer:
         
         # Rekomendasi berdasarkan volume vs COGS
         menu_analysis = self.get_comprehensive_menu_analysis(data)
-        high_volume_high_cogs = menu_analysis[
-            (menu_analysis['Total_Qty'] > menu_analysis['Total_Qty'].quantile(0.7)) &
-            (menu_analysis['Avg_COGS_Pct'] > menu_analysis['Avg_COGS_Pct'].quantile(0.7))
-        ]
-        
-        if not high_volume_high_cogs.empty:
+        n_high_volume_high_cogs = 0
+        if not menu_analysis.empty:
+            # Persentil ke-70 kedua kolom dalam satu panggilan (interpolasi linear seperti Series.quantile)
+            qty_cogs = menu_analysis[['Total_Qty', 'Avg_COGS_Pct']].to_numpy(dtype=float)
+            q_qty, q_cogs = np.percentile(qty_cogs, 70, axis=0)
+            n_high_volume_high_cogs = int(((qty_cogs[:, 0] > q_qty) & (qty_cogs[:, 1] > q_cogs)).sum())
+        
+        if n_high_volume_high_cogs:
             recommendations.append({
                 'title': 'Prioritas Optimasi Menu Volume Tinggi',
-                'description': f'Terdapat {len(high_volume_high_cogs)} menu dengan volume tinggi namun COGS tinggi. Optimasi menu-menu ini akan memberikan dampak besar.',
+                'description': f'Terdapat {n_high_volume_high_cogs} menu dengan volume tinggi namun COGS tinggi. Optimasi menu-menu ini akan memberikan dampak besar.',
                 'potential_saving': 'Impact tertinggi pada profitabilitas keseluruhan'
             })
         
@@ -521,26 +804,32 @@ class SalesDataAnalyzer:
             dict: Data summary for AI
         """
         # Basic metrics
-        total_revenue = data['Total'].sum()
-        total_cogs = data['COGS Total'].sum()
-        total_margin = data['Margin'].sum()
-        avg_cogs_pct = data['COGS Total (%)'].mean()
+        totals = data.agg({
+            'Total': 'sum',
+            'COGS Total': 'sum',
+            'Margin': 'sum'
+        })
+        total_revenue = totals['Total']
+        total_cogs = totals['COGS Total']
+        total_margin = totals['Margin']
+        avg_cogs_pct = data['COGS Total (%)'].to_numpy(dtype=np.float64).mean()
         total_transactions = len(data)
         
-        # Top performers
+        # Top performers (keduanya dari satu ringkasan per menu)
         top_menus = self.get_top_performing_menus(data, 5)
         top_profitable = self.get_most_profitable_menus(data, 5)
         
         # Category analysis
-        category_performance = data.groupby('Menu Category').agg({
+        category_performance = self._grouper(data, 'Menu Category').agg({
             'Total': 'sum',
-            'Margin': 'sum',
-            'COGS Total (%)': 'mean'
-        }).reset_index()
+            'Margin': 'sum'
+        })
+        category_performance['COGS Total (%)'] = self._group_mean64(data, 'Menu Category', 'COGS Total (%)')
+        category_performance = category_performance.reset_index()
         
         # Time analysis
         date_range = self.get_date_range()
-        daily_avg = total_revenue / data['Date'].nunique()
+        daily_avg = total_revenue / self._count_days(data)
         
         summary = {
             'period': date_range,
@@ -2,9 +2,115 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import warnings
+import functools
+import inspect
 import io
+import logging
+from openpyxl import load_workbook
 warnings.filterwarnings('ignore')
 
+logger = logging.getLogger(__name__)
+
+# Urutan hari Senin-Minggu, sesuai kode Series.dt.dayofweek (0 = Monday)
+DAY_ORDER = np.array(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'])
+
+# Kolom file cabang yang dipakai analisis; kolom lain (Sales Type, Menu Code, ...) tidak dibaca
+_BRANCH_COLUMNS = frozenset([
+    'Sales Number', 'Sales Date', 'Menu', 'Qty', 'Price', 'Total',
+    'Discount Total', 'COGS Total', 'COGS Total (%)', 'Margin'
+])
+
+
+def _is_branch_column(name):
+    """Filter usecols read_excel: kolom yang tidak ada di file tidak membuat parse gagal."""
+    return name in _BRANCH_COLUMNS
+
+
+def _ratio(numerator, denominator, scale=1.0):
+    """
+    numerator / denominator * scale per elemen; 0 jika penyebut <= 0 (tanpa inf/NaN).
+    
+    Args:
+        numerator: Series/array pembilang
+        denominator: Series/array penyebut
+        scale: Faktor pengali (100 untuk persentase)
+        
+    Returns:
+        np.ndarray: Hasil float64
+    """
+    num = np.asarray(numerator, dtype=float)
+    den = np.asarray(denominator, dtype=float)
+    out = np.zeros_like(num)
+    np.divide(num, den, out=out, where=den > 0)
+    if scale != 1.0:
+        out *= scale
+    return out
+
+
+def _branch_metrics(total_revenue, total_margin, total_cogs, start_date, end_date):
+    """
+    Margin %, COGS % dan revenue per hari per cabang dalam satu fungsi numpy.
+    
+    Args:
+        total_revenue: Array revenue per cabang
+        total_margin: Array margin per cabang
+        total_cogs: Array COGS per cabang
+        start_date: Array datetime64 transaksi pertama
+        end_date: Array datetime64 transaksi terakhir
+        
+    Returns:
+        tuple: (margin_pct, cogs_pct, revenue_per_day) sebagai array float64
+    """
+    margin_pct = _ratio(total_margin, total_revenue, 100.0)
+    cogs_pct = _ratio(total_cogs, total_revenue, 100.0)
+    
+    # Revenue per hari aktif (minimal 1 hari); 0 jika rentang tanggal tidak diketahui
+    span = end_date - start_date
+    days = np.floor(span / np.timedelta64(1, 'D')) + 1
+    revenue_per_day = np.where(np.isnat(span), 0.0, np.asarray(total_revenue, dtype=float) / np.fmax(days, 1))
+    
+    return margin_pct, cogs_pct, revenue_per_day
+
+
+def _menu_codes(menu):
+    """
+    Kode Menu terurut nama beserta labelnya; langsung dari kategori bila sudah categorical.
+    
+    Args:
+        menu: Series kolom Menu
+        
+    Returns:
+        tuple: (np.ndarray kode per baris, label per kode)
+    """
+    if isinstance(menu.dtype, pd.CategoricalDtype) and menu.cat.categories.is_monotonic_increasing:
+        return menu.cat.codes.to_numpy(), menu.cat.categories
+    return pd.factorize(menu, sort=True)
+
+
+def _cached_result(method):
+    """
+    Memo hasil method analisis per (nama method, argumen) selama combined_data
+    masih objek yang sama. Hasil dibagi antar pemanggil: jangan diubah in-place.
+    """
+    signature = inspect.signature(method)
+    
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        key = (method.__name__,) + bound.args[1:]
+        
+        entry = self._agg_cache.get(key)
+        if entry is not None and entry[0] is self.combined_data:
+            return entry[1]
+        
+        result = method(self, *args, **kwargs)
+        self._agg_cache[key] = (self.combined_data, result)
+        return result
+    
+    return wrapper
+
+
 class MultiBranchSalesAnalyzer:
     """
     Kelas untuk menganalisis data sales dari multiple cabang/branch.
@@ -21,6 +127,15 @@ class MultiBranchSalesAnalyzer:
         self.min_date = None
         self.max_date = None
         self.branches = []
+        self._agg_cache = {}
+        
+        # Ringkasan skalar combined_data, diisi sekali di _prepare_combined_data
+        self._total_revenue = 0
+        self._total_margin = 0
+        self._total_cogs = 0
+        self._avg_cogs_pct = 0
+        self._unique_products = 0
+        self._avg_transaction = 0
     
     def load_multiple_files(self, uploaded_files):
         """
@@ -33,26 +148,48 @@ class MultiBranchSalesAnalyzer:
             pd.DataFrame: Combined data from all branches
         """
         all_data = []
+        branch_names = []
         
         for uploaded_file in uploaded_files:
             try:
                 # Load dan extract branch data
                 branch_data = self._load_single_branch_file(uploaded_file)
-                if not branch_data.empty:
+                if branch_data is not None and not branch_data.empty:
+                    # Branch konstan per file: cukup simpan namanya, kolom per baris dilepas
+                    # di tempat (pop) agar tidak ikut disalin saat concat
+                    branch_name = branch_data.pop('Branch').iat[0]
                     all_data.append(branch_data)
+                    branch_names.append(branch_name)
+                    
+                    # Store file info
+                    self.branch_files[branch_name] = {
+                        'filename': getattr(uploaded_file, 'name', 'uploaded_file'),
+                        'records': len(branch_data)
+                    }
                     
             except Exception as e:
-                print(f"Error loading {getattr(uploaded_file, 'name', 'file')}: {str(e)}")
+                logger.warning("Error loading %s: %s", getattr(uploaded_file, 'name', 'file'), e)
                 continue
         
         if all_data:
             # Combine all data
-            self.combined_data = pd.concat(all_data, ignore_index=True)
+            row_counts = [len(branch_data) for branch_data in all_data]
+            self.combined_data = pd.concat(all_data, ignore_index=True, copy=False)
+            # Frame per cabang dilepas sebelum kolom turunan dibuat: puncak memori ~1x data
+            all_data.clear()
+            
+            # Branch dibangun langsung sebagai kategori dari kode per file,
+            # bukan concat + hash ulang string per baris
+            categories, branch_codes = np.unique(branch_names, return_inverse=True)
+            self.combined_data['Branch'] = pd.Categorical.from_codes(
+                np.repeat(branch_codes, row_counts), categories=categories.astype(object)
+            )
             self._prepare_combined_data()
             
         return self.combined_data
     
-    def _load_single_branch_file(self, uploaded_file):
+    @staticmethod
+    def _load_single_branch_file(uploaded_file):
         """
         Memuat single file Excel dengan struktur yang benar.
         
@@ -67,51 +204,71 @@ class MultiBranchSalesAnalyzer:
             if hasattr(uploaded_file, 'seek'):
                 uploaded_file.seek(0)
             
-            # Baca file Excel - ambil nama cabang dari A2
-            temp_df = pd.read_excel(uploaded_file, header=None, nrows=5)
-            
-            # Extract branch name dari A2 (baris 2, kolom A = index [1,0])
-            branch_name = "Unknown Branch"
-            if len(temp_df) > 1 and len(temp_df.columns) > 0:
-                if pd.notna(temp_df.iloc[1, 0]):  # A2 = row 1, col 0 (0-indexed)
-                    branch_name = str(temp_df.iloc[1, 0]).strip()
+            # Nama cabang dari A2 tanpa mem-parse seluruh sheet
+            branch_name = MultiBranchSalesAnalyzer._read_branch_name(uploaded_file)
             
             # Reset file pointer lagi
             if hasattr(uploaded_file, 'seek'):
                 uploaded_file.seek(0)
             
             # Baca data dengan header di baris 14 (index 13)
-            df = pd.read_excel(uploaded_file, header=13)  # Baris 14 = index 13
+            # Hanya kolom yang dipakai analisis yang di-parse
+            df = pd.read_excel(uploaded_file, header=13, usecols=_is_branch_column)  # Baris 14 = index 13
             
             # Verifikasi kolom yang diperlukan ada
             required_columns = ['Sales Number', 'Sales Date', 'Menu', 'Total', 'COGS Total', 'COGS Total (%)', 'Margin']
             missing_columns = [col for col in required_columns if col not in df.columns]
             
             if missing_columns:
-                print(f"Missing columns in {getattr(uploaded_file, 'name', 'file')}: {missing_columns}")
+                logger.warning("Missing columns in %s: %s", getattr(uploaded_file, 'name', 'file'), missing_columns)
                 return pd.DataFrame()
             
             # Clean data
-            df = self._clean_branch_data(df)
+            df = MultiBranchSalesAnalyzer._clean_branch_data(df)
             
             if not df.empty:
                 # Add branch column
                 df['Branch'] = branch_name
                 
-                # Store file info
-                self.branch_files[branch_name] = {
-                    'filename': getattr(uploaded_file, 'name', 'uploaded_file'),
-                    'records': len(df)
-                }
-                
-                print(f"Successfully loaded {len(df)} records from {branch_name}")
-                return df
+                logger.debug("Successfully loaded %s records from %s", len(df), branch_name)
+            return df
             
         except Exception as e:
-            print(f"Error processing {getattr(uploaded_file, 'name', 'file')}: {str(e)}")
+            logger.warning("Error processing %s: %s", getattr(uploaded_file, 'name', 'file'), e)
             return pd.DataFrame()
     
-    def _clean_branch_data(self, df):
+    @staticmethod
+    def _read_branch_name(uploaded_file):
+        """
+        Membaca nama cabang dari sel A2.
+        
+        Workbook .xlsx dibuka read_only sehingga hanya baris awal yang di-parse;
+        format lain (.xls) memakai read_excel 5 baris pertama.
+        
+        Args:
+            uploaded_file: File-like object atau file path
+            
+        Returns:
+            str: Nama cabang, "Unknown Branch" jika A2 kosong
+        """
+        try:
+            wb = load_workbook(uploaded_file, read_only=True, data_only=True)
+            try:
+                value = wb.active['A2'].value
+            finally:
+                wb.close()
+        except Exception:
+            if hasattr(uploaded_file, 'seek'):
+                uploaded_file.seek(0)
+            temp_df = pd.read_excel(uploaded_file, header=None, nrows=5)
+            value = temp_df.iloc[1, 0] if len(temp_df) > 1 and len(temp_df.columns) > 0 else None
+        
+        if value is None or pd.isna(value):
+            return "Unknown Branch"
+        return str(value).strip()
+    
+    @staticmethod
+    def _clean_branch_data(df):
         """
         Membersihkan data dari single branch.
         
@@ -121,37 +278,44 @@ class MultiBranchSalesAnalyzer:
         Returns:
             pd.DataFrame: Cleaned data
         """
-        # Copy data
-        data = df.copy()
+        # Frame hasil read_excel hanya dipakai di sini: dropna sudah memberi frame baru, tanpa copy()
+        data = df.dropna(subset=['Menu', 'Sales Date', 'Total'])
         
-        # Hapus baris kosong berdasarkan kolom kunci
-        data = data.dropna(subset=['Menu', 'Sales Date', 'Total'])
-        
-        # Konversi Sales Date
-        if 'Sales Date' in data.columns:
+        # Konversi Sales Date (read_excel sudah memberi datetime64 untuk sel bertipe tanggal)
+        if 'Sales Date' in data.columns and not pd.api.types.is_datetime64_any_dtype(data['Sales Date']):
             data['Sales Date'] = pd.to_datetime(data['Sales Date'], errors='coerce')
         
-        # Pastikan kolom numerik dalam format yang benar
-        numeric_columns = ['Qty', 'Price', 'Total', 'COGS Total', 'COGS Total (%)', 'Margin']
-        for col in numeric_columns:
-            if col in data.columns:
-                # Convert to numeric, handling various formats
-                data[col] = pd.to_numeric(data[col], errors='coerce')
+        # Pastikan kolom numerik dalam format yang benar; kolom yang sudah numerik dilewati
+        numeric_columns = [
+            col for col in ['Qty', 'Price', 'Total', 'COGS Total', 'COGS Total (%)', 'Margin']
+            if col in data.columns and not pd.api.types.is_numeric_dtype(data[col])
+        ]
+        if numeric_columns:
+            # Convert to numeric, handling various formats (satu apply untuk semua kolom)
+            data[numeric_columns] = data[numeric_columns].apply(pd.to_numeric, errors='coerce')
         
         # Handle Discount Total if exists
         if 'Discount Total' in data.columns:
             data['Discount Total'] = pd.to_numeric(data['Discount Total'], errors='coerce').fillna(0)
         
-        # Hapus baris dengan nilai numerik yang tidak valid pada kolom kunci
-        data = data.dropna(subset=['Sales Date', 'Total', 'COGS Total', 'Margin'])
-        
-        # Filter data yang masuk akal (positive values)
-        data = data[data['Total'] > 0]
-        data = data[data['COGS Total'] >= 0]
-        
-        # Ensure COGS percentage is reasonable (0-100%)
+        # Satu mask gabungan (satu salinan) untuk semua filter validitas:
+        # - nilai numerik/tanggal yang tidak valid pada kolom kunci
+        # - nilai yang masuk akal (Total positif, COGS tidak negatif)
+        # - COGS percentage 0-100% jika kolomnya ada
+        total = data['Total'].to_numpy(dtype=float)
+        cogs = data['COGS Total'].to_numpy(dtype=float)
+        mask = (
+            data['Sales Date'].notna().to_numpy()
+            & data['Margin'].notna().to_numpy()
+            & (total > 0)
+            & (cogs >= 0)
+        )
         if 'COGS Total (%)' in data.columns:
-            data = data[data['COGS Total (%)'].between(0, 100)]
+            cogs_pct = data['COGS Total (%)'].to_numpy(dtype=float)
+            mask &= (cogs_pct >= 0) & (cogs_pct <= 100)
+        
+        if not mask.all():
+            data = data[mask]
         
         return data
     
@@ -159,47 +323,52 @@ class MultiBranchSalesAnalyzer:
         """
         Mempersiapkan combined data untuk analisis dengan SAFE calculations.
         """
+        # Hasil agregasi lama tidak berlaku lagi untuk data baru
+        self._agg_cache.clear()
+        
         if not self.combined_data.empty:
             # Add time-based columns
             self.combined_data['Hour'] = self.combined_data['Sales Date'].dt.hour
-            self.combined_data['Day_of_Week'] = self.combined_data['Sales Date'].dt.day_name()
+            # Nama hari sebagai kategori dari kode dayofweek (int), tanpa day_name() per baris
+            self.combined_data['Day_of_Week'] = pd.Categorical.from_codes(
+                self.combined_data['Sales Date'].dt.dayofweek.to_numpy(dtype=np.int8), categories=DAY_ORDER, ordered=True
+            )
             self.combined_data['Week'] = self.combined_data['Sales Date'].dt.isocalendar().week
             self.combined_data['Month'] = self.combined_data['Sales Date'].dt.month
             self.combined_data['Date'] = self.combined_data['Sales Date'].dt.date
             
-            # SAFE: Calculate additional metrics with error handling
-            try:
-                # Calculate Margin_Percentage safely
-                self.combined_data['Margin_Percentage'] = np.where(
-                    self.combined_data['Total'] > 0,
-                    (self.combined_data['Margin'] / self.combined_data['Total']) * 100,
-                    0
-                )
-                print("✅ Margin_Percentage calculated successfully")
-            except Exception as e:
-                print(f"❌ Error calculating Margin_Percentage: {e}")
-                self.combined_data['Margin_Percentage'] = 0
+            # Kunci groupby string jadi kategori: groupby jalan di atas int codes
+            for col in ('Branch', 'Menu'):
+                if not isinstance(self.combined_data[col].dtype, pd.CategoricalDtype):
+                    self.combined_data[col] = self.combined_data[col].astype('category')
             
-            try:
-                # Calculate COGS_Efficiency safely
-                self.combined_data['COGS_Efficiency'] = np.where(
-                    self.combined_data['COGS Total (%)'].notna(),
-                    100 - self.combined_data['COGS Total (%)'],
-                    0
-                )
-                print("✅ COGS_Efficiency calculated successfully")
-            except Exception as e:
-                print(f"❌ Error calculating COGS_Efficiency: {e}")
-                self.combined_data['COGS_Efficiency'] = 0
+            # SAFE: metrik turunan langsung di atas array numpy
+            self.combined_data['Margin_Percentage'] = _ratio(
+                self.combined_data['Margin'].to_numpy(), self.combined_data['Total'].to_numpy(), 100.0
+            )
+            cogs_pct = self.combined_data['COGS Total (%)'].to_numpy(dtype=float)
+            self.combined_data['COGS_Efficiency'] = np.where(np.isnan(cogs_pct), 0.0, 100.0 - cogs_pct)
             
             # Set basic info
             self.total_records = len(self.combined_data)
             self.min_date = self.combined_data['Sales Date'].min()
             self.max_date = self.combined_data['Sales Date'].max()
-            self.branches = sorted(self.combined_data['Branch'].unique().tolist())
             
-            print(f"Combined data prepared: {self.total_records} records from {len(self.branches)} branches")
+            # Branch sudah kategori yang dibangun dari cabang yang benar-benar dimuat:
+            # kategorinya = cabang unik, tanpa hash pass atas seluruh baris
+            self.branches = sorted(self.combined_data['Branch'].cat.categories.tolist())
+            
+            # Skalar summary dihitung sekali di sini, bukan pada setiap get_branch_summary_stats
+            self._total_revenue = self.combined_data['Total'].sum()
+            self._total_margin = self.combined_data['Margin'].sum()
+            self._total_cogs = self.combined_data['COGS Total'].sum()
+            self._avg_cogs_pct = self.combined_data['COGS Total (%)'].mean()
+            self._unique_products = self.combined_data['Menu'].nunique()
+            self._avg_transaction = self.combined_data['Total'].mean()
+            
+            logger.debug("Combined data prepared: %s records from %s branches", self.total_records, len(self.branches))
     
+    @_cached_result
     def get_branch_revenue_comparison(self):
         """
         Komparasi pendapatan semua cabang dengan SAFE calculations.
@@ -208,13 +377,13 @@ class MultiBranchSalesAnalyzer:
             pd.DataFrame: Revenue comparison by branch
         """
         try:
-            branch_comparison = self.combined_data.groupby('Branch').agg({
+            branch_comparison = self.combined_data.groupby('Branch', observed=True).agg({
                 'Total': ['sum', 'mean', 'count'],
                 'Margin': ['sum', 'mean'],
                 'COGS Total': 'sum',
                 'Qty': 'sum',
                 'Sales Date': ['min', 'max']
-            }).round(2)
+            })
             
             # Flatten column names
             branch_comparison.columns = [
@@ -223,32 +392,19 @@ class MultiBranchSalesAnalyzer:
                 'Start_Date', 'End_Date'
             ]
             
-            # SAFE: Calculate additional metrics with error handling
-            try:
-                branch_comparison['Margin_Percentage'] = np.where(
-                    branch_comparison['Total_Revenue'] > 0,
-                    (branch_comparison['Total_Margin'] / branch_comparison['Total_Revenue']) * 100,
-                    0
-                )
-            except:
-                branch_comparison['Margin_Percentage'] = 0
-            
-            try:
-                branch_comparison['COGS_Percentage'] = np.where(
-                    branch_comparison['Total_Revenue'] > 0,
-                    (branch_comparison['Total_COGS'] / branch_comparison['Total_Revenue']) * 100,
-                    0
-                )
-            except:
-                branch_comparison['COGS_Percentage'] = 0
-            
-            try:
-                branch_comparison['Revenue_per_Day'] = branch_comparison.apply(
-                    lambda row: row['Total_Revenue'] / max(1, (row['End_Date'] - row['Start_Date']).days + 1) if pd.notna(row['End_Date']) and pd.notna(row['Start_Date']) else 0,
-                    axis=1
-                )
-            except:
-                branch_comparison['Revenue_per_Day'] = 0
+            # SAFE: metrik turunan dihitung sekaligus dari array hasil agregasi
+            margin_pct, cogs_pct, revenue_per_day = _branch_metrics(
+                branch_comparison['Total_Revenue'].to_numpy(),
+                branch_comparison['Total_Margin'].to_numpy(),
+                branch_comparison['Total_COGS'].to_numpy(),
+                branch_comparison['Start_Date'].to_numpy(),
+                branch_comparison['End_Date'].to_numpy()
+            )
+            branch_comparison = branch_comparison.assign(
+                Margin_Percentage=margin_pct,
+                COGS_Percentage=cogs_pct,
+                Revenue_per_Day=revenue_per_day
+            )
             
             # Reset index and sort by revenue
             branch_comparison = branch_comparison.reset_index()
@@ -260,9 +416,46 @@ class MultiBranchSalesAnalyzer:
             return branch_comparison
             
         except Exception as e:
-            print(f"❌ Error in get_branch_revenue_comparison: {e}")
+            logger.error("❌ Error in get_branch_revenue_comparison: %s", e)
             return pd.DataFrame()
     
+    @_cached_result
+    def _menu_total_ranking(self):
+        """
+        Ranking menu berdasarkan total revenue, dihitung sekali per combined_data
+        dan dipakai bersama oleh semua permintaan top-N.
+        
+        Satu kali factorize Menu (kode terurut seperti groupby) + bincount revenue.
+        
+        Returns:
+            tuple: (kode Menu per baris, kode menu urut revenue menurun)
+        """
+        codes, uniques = pd.factorize(self.combined_data['Menu'], sort=True)
+        totals = np.bincount(codes, weights=self.combined_data['Total'].to_numpy(dtype=float), minlength=len(uniques))
+        
+        # Stable argsort = nlargest(keep='first'): seri diselesaikan oleh urutan nama menu
+        return codes, np.argsort(-totals, kind='stable')
+    
+    def _top_menu_mask(self, top_n):
+        """
+        Mask baris untuk top-N menu berdasarkan total revenue.
+        
+        Membership lewat lookup kode dari _menu_total_ranking, menggantikan
+        groupby + nlargest + isin.
+        
+        Args:
+            top_n: Jumlah menu teratas
+            
+        Returns:
+            np.ndarray: Boolean mask sepanjang combined_data
+        """
+        codes, ranking = self._menu_total_ranking()
+        keep = np.zeros(len(ranking), dtype=bool)
+        keep[ranking[:top_n]] = True
+        
+        return keep[codes]
+    
+    @_cached_result
     def get_product_comparison_by_branch(self, top_n_products=None):
         """
         Komparasi produk per cabang dengan SAFE calculations.
@@ -277,58 +470,38 @@ class MultiBranchSalesAnalyzer:
         try:
             if top_n_products is None:
                 # Ambil SEMUA produk
-                print("📦 Getting product comparison for ALL products...")
-                filtered_data = self.combined_data.copy()
+                logger.debug("📦 Getting product comparison for ALL products...")
+                # groupby tidak memodifikasi frame: tidak perlu salinan penuh
+                filtered_data = self.combined_data
             else:
                 # Get top products overall
-                print(f"📦 Getting product comparison for top {top_n_products} products...")
-                top_products = self.combined_data.groupby('Menu')['Total'].sum().nlargest(top_n_products).index
-                filtered_data = self.combined_data[self.combined_data['Menu'].isin(top_products)]
+                logger.debug("📦 Getting product comparison for top %s products...", top_n_products)
+                filtered_data = self.combined_data[self._top_menu_mask(top_n_products)]
             
-            print(f"✅ Filtered data: {len(filtered_data)} records")
+            logger.debug("✅ Filtered data: %s records", len(filtered_data))
             
             # Create comparison data - GROUP BY Menu dan Branch
-            product_comparison = filtered_data.groupby(['Menu', 'Branch']).agg({
+            product_comparison = filtered_data.groupby(['Menu', 'Branch'], observed=True).agg({
                 'Qty': 'sum',
                 'Total': 'sum',
                 'Margin': 'sum',
                 'COGS Total (%)': 'mean'
             }).reset_index()
             
-            print(f"✅ Product comparison: {len(product_comparison)} unique menu-branch combinations")
-            
-            # SAFE: Calculate metrics with error handling
-            try:
-                product_comparison['Revenue_per_Unit'] = np.where(
-                    product_comparison['Qty'] > 0,
-                    product_comparison['Total'] / product_comparison['Qty'],
-                    0
-                )
-            except:
-                product_comparison['Revenue_per_Unit'] = 0
-            
-            try:
-                product_comparison['Margin_per_Unit'] = np.where(
-                    product_comparison['Qty'] > 0,
-                    product_comparison['Margin'] / product_comparison['Qty'],
-                    0
-                )
-            except:
-                product_comparison['Margin_per_Unit'] = 0
+            logger.debug("✅ Product comparison: %s unique menu-branch combinations", len(product_comparison))
             
-            try:
-                product_comparison['Margin_Percentage'] = np.where(
-                    product_comparison['Total'] > 0,
-                    (product_comparison['Margin'] / product_comparison['Total']) * 100,
-                    0
-                )
-            except:
-                product_comparison['Margin_Percentage'] = 0
+            # SAFE: rasio per unit/persentase; penyebut <= 0 menghasilkan 0
+            qty = product_comparison['Qty'].to_numpy()
+            total = product_comparison['Total'].to_numpy()
+            margin = product_comparison['Margin'].to_numpy()
+            product_comparison['Revenue_per_Unit'] = _ratio(total, qty)
+            product_comparison['Margin_per_Unit'] = _ratio(margin, qty)
+            product_comparison['Margin_Percentage'] = _ratio(margin, total, 100.0)
             
             return product_comparison
             
         except Exception as e:
-            print(f"❌ Error in get_product_comparison_by_branch: {e}")
+            logger.error("❌ Error in get_product_comparison_by_branch: %s", e)
             return pd.DataFrame()
     
     def get_sales_by_time_all_branches(self):
@@ -341,43 +514,47 @@ class MultiBranchSalesAnalyzer:
         time_analysis = {}
         
         try:
+            # Satu factorize Branch + satu ekstraksi kolom nilai untuk kelima bucket waktu
+            branch_codes, branches = pd.factorize(self.combined_data['Branch'], sort=True)
+            values = {
+                col: self.combined_data[col].to_numpy()
+                for col in ('Total', 'Qty', 'Margin')
+            }
+            
             # Hourly sales by branch
-            time_analysis['hourly'] = self.combined_data.groupby(['Branch', 'Hour']).agg({
-                'Total': 'sum',
-                'Qty': 'sum',
-                'Margin': 'sum'
-            }).reset_index()
+            time_analysis['hourly'] = self._branch_bucket_agg(
+                'Hour', [('Total', 'sum'), ('Qty', 'sum'), ('Margin', 'sum')],
+                branch_codes, branches, values
+            )
             
             # Daily pattern by branch
-            daily_pattern = self.combined_data.groupby(['Branch', 'Day_of_Week']).agg({
-                'Total': ['sum', 'mean'],
-                'Qty': 'sum'
-            }).reset_index()
+            daily_pattern = self._branch_bucket_agg(
+                'Day_of_Week', [('Total', 'sum'), ('Total', 'mean'), ('Qty', 'sum')],
+                branch_codes, branches, values
+            )
             daily_pattern.columns = ['Branch', 'Day_of_Week', 'Total_Revenue', 'Avg_Revenue', 'Total_Qty']
             time_analysis['daily_pattern'] = daily_pattern
             
             # Daily trend by branch
-            time_analysis['daily_trend'] = self.combined_data.groupby(['Branch', 'Date']).agg({
-                'Total': 'sum',
-                'Qty': 'sum',
-                'Margin': 'sum'
-            }).reset_index()
+            time_analysis['daily_trend'] = self._branch_bucket_agg(
+                'Date', [('Total', 'sum'), ('Qty', 'sum'), ('Margin', 'sum')],
+                branch_codes, branches, values
+            )
             
             # Weekly comparison
-            time_analysis['weekly'] = self.combined_data.groupby(['Branch', 'Week']).agg({
-                'Total': 'sum',
-                'Qty': 'sum'
-            }).reset_index()
+            time_analysis['weekly'] = self._branch_bucket_agg(
+                'Week', [('Total', 'sum'), ('Qty', 'sum')],
+                branch_codes, branches, values
+            )
             
             # Monthly comparison
-            time_analysis['monthly'] = self.combined_data.groupby(['Branch', 'Month']).agg({
-                'Total': 'sum',
-                'Qty': 'sum',
-                'Margin': 'sum'
-            }).reset_index()
+            time_analysis['monthly'] = self._branch_bucket_agg(
+                'Month', [('Total', 'sum'), ('Qty', 'sum'), ('Margin', 'sum')],
+                branch_codes, branches, values
+            )
             
         except Exception as e:
-            print(f"❌ Error in get_sales_by_time_all_branches: {e}")
+            logger.error("❌ Error in get_sales_by_time_all_branches: %s", e)
             # Return empty structure
             time_analysis = {
                 'hourly': pd.DataFrame(),
@@ -389,6 +566,54 @@ class MultiBranchSalesAnalyzer:
         
         return time_analysis
     
+    def _branch_bucket_agg(self, key, spec, branch_codes, branches, values):
+        """
+        Agregasi per (Branch, key) dengan np.bincount atas kode gabungan,
+        setara groupby(['Branch', key], observed=True).agg(...).reset_index().
+        
+        Args:
+            key: Kolom bucket waktu (Hour, Day_of_Week, Date, Week, Month)
+            spec: List (kolom, 'sum' | 'mean')
+            branch_codes: Kode Branch terurut dari pd.factorize(sort=True)
+            branches: Nilai unik Branch untuk branch_codes
+            values: Dict kolom -> np.ndarray yang dipakai bersama antar bucket
+            
+        Returns:
+            pd.DataFrame: Branch, key, lalu kolom sesuai urutan spec
+        """
+        key_codes, keys = pd.factorize(self.combined_data[key], sort=True)
+        n_keys = len(keys)
+        
+        # Kode gabungan terurut Branch lalu key, seperti urutan hasil groupby
+        codes = branch_codes * n_keys + key_codes
+        valid = (branch_codes >= 0) & (key_codes >= 0)
+        if not valid.all():  # kunci NaN tidak ikut, seperti groupby
+            codes = codes[valid]
+        size = len(branches) * n_keys
+        present = np.flatnonzero(np.bincount(codes, minlength=size))
+        
+        result = {
+            'Branch': branches.take(present // n_keys),
+            key: keys.take(present % n_keys),
+        }
+        for col, func in spec:
+            column = values[col] if valid.all() else values[col][valid]
+            weights = column.astype(float, copy=False)
+            nan = np.isnan(weights)
+            if nan.any():  # NaN dilewati, seperti sum/mean groupby
+                weights = np.where(nan, 0.0, weights)
+            sums = np.bincount(codes, weights=weights, minlength=size)[present]
+            if func == 'mean':
+                counts = np.bincount(codes, weights=~nan, minlength=size)[present]
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    result[col + '_mean'] = sums / counts
+            elif np.issubdtype(column.dtype, np.integer):
+                result[col] = sums.astype(np.int64)  # sum kolom integer tetap integer
+            else:
+                result[col] = sums
+        return pd.DataFrame(result)
+    
+    @_cached_result
     def get_cogs_per_product_per_branch(self, top_n_products=None):
         """
         COGS per product per cabang dengan SAFE calculations.
@@ -403,18 +628,19 @@ class MultiBranchSalesAnalyzer:
         try:
             if top_n_products is None:
                 # Ambil SEMUA produk
-                print("📊 Getting COGS for ALL products...")
-                filtered_data = self.combined_data.copy()
+                logger.debug("📊 Getting COGS for ALL products...")
+                # groupby tidak memodifikasi frame: tidak perlu salinan penuh
+                filtered_data = self.combined_data
             else:
                 # Get top products by revenue
-                print(f"📊 Getting COGS for top {top_n_products} products...")
-                top_products = self.combined_data.groupby('Menu')['Total'].sum().nlargest(top_n_products).index
-                filtered_data = self.combined_data[self.combined_data['Menu'].isin(top_products)]
+                logger.debug("📊 Getting COGS for top %s products...", top_n_products)
+                filtered_data = self.combined_data[self._top_menu_mask(top_n_products)]
             
-            print(f"✅ Filtered data: {len(filtered_data)} records")
+            logger.debug("✅ Filtered data: %s records", len(filtered_data))
             
             # COGS analysis - GROUP BY Menu dan Branch untuk menghindari duplikasi
-            cogs_analysis = filtered_data.groupby(['Menu', 'Branch']).agg({
+            # Urutan akhir ditentukan sort_values di bawah, groupby tidak perlu sort
+            cogs_analysis = filtered_data.groupby(['Menu', 'Branch'], observed=True, sort=False).agg({
                 'COGS Total': 'sum',
                 'COGS Total (%)': 'mean',
                 'Total': 'sum',
@@ -422,53 +648,18 @@ class MultiBranchSalesAnalyzer:
                 'Margin': 'sum'
             }).reset_index()
             
-            print(f"✅ COGS analysis: {len(cogs_analysis)} unique menu-branch combinations")
-            
-            # SAFE: Calculate metrics with error handling
-            try:
-                cogs_analysis['COGS_per_Unit'] = np.where(
-                    cogs_analysis['Qty'] > 0,
-                    cogs_analysis['COGS Total'] / cogs_analysis['Qty'],
-                    0
-                )
-            except:
-                cogs_analysis['COGS_per_Unit'] = 0
-            
-            try:
-                cogs_analysis['Revenue_per_Unit'] = np.where(
-                    cogs_analysis['Qty'] > 0,
-                    cogs_analysis['Total'] / cogs_analysis['Qty'],
-                    0
-                )
-            except:
-                cogs_analysis['Revenue_per_Unit'] = 0
-            
-            try:
-                cogs_analysis['Margin_per_Unit'] = np.where(
-                    cogs_analysis['Qty'] > 0,
-                    cogs_analysis['Margin'] / cogs_analysis['Qty'],
-                    0
-                )
-            except:
-                cogs_analysis['Margin_per_Unit'] = 0
-            
-            try:
-                cogs_analysis['COGS_Efficiency'] = np.where(
-                    cogs_analysis['COGS Total (%)'].notna(),
-                    100 - cogs_analysis['COGS Total (%)'],
-                    0
-                )
-            except:
-                cogs_analysis['COGS_Efficiency'] = 0
+            logger.debug("✅ COGS analysis: %s unique menu-branch combinations", len(cogs_analysis))
             
-            try:
-                cogs_analysis['Margin_Percentage'] = np.where(
-                    cogs_analysis['Total'] > 0,
-                    (cogs_analysis['Margin'] / cogs_analysis['Total']) * 100,
-                    0
-                )
-            except:
-                cogs_analysis['Margin_Percentage'] = 0
+            # SAFE: rasio per unit/persentase; penyebut <= 0 menghasilkan 0
+            qty = cogs_analysis['Qty'].to_numpy()
+            total = cogs_analysis['Total'].to_numpy()
+            margin = cogs_analysis['Margin'].to_numpy()
+            cogs_pct = cogs_analysis['COGS Total (%)'].to_numpy(dtype=float)
+            cogs_analysis['COGS_per_Unit'] = _ratio(cogs_analysis['COGS Total'].to_numpy(), qty)
+            cogs_analysis['Revenue_per_Unit'] = _ratio(total, qty)
+            cogs_analysis['Margin_per_Unit'] = _ratio(margin, qty)
+            cogs_analysis['COGS_Efficiency'] = np.where(np.isnan(cogs_pct), 0.0, 100.0 - cogs_pct)
+            cogs_analysis['Margin_Percentage'] = _ratio(margin, total, 100.0)
             
             # Sort by COGS percentage
             cogs_analysis = cogs_analysis.sort_values(['Menu', 'COGS Total (%)'])
@@ -476,7 +667,7 @@ class MultiBranchSalesAnalyzer:
             return cogs_analysis
             
         except Exception as e:
-            print(f"❌ Error in get_cogs_per_product_per_branch: {e}")
+            logger.error("❌ Error in get_cogs_per_product_per_branch: %s", e)
             return pd.DataFrame()
     
     def get_branch_summary_stats(self):
@@ -491,17 +682,17 @@ class MultiBranchSalesAnalyzer:
                 'total_branches': len(self.branches),
                 'total_records': self.total_records,
                 'date_range': f"{self.min_date.strftime('%d/%m/%Y')} - {self.max_date.strftime('%d/%m/%Y')}" if self.min_date and self.max_date else "No date range",
-                'total_revenue': self.combined_data['Total'].sum() if not self.combined_data.empty else 0,
-                'total_margin': self.combined_data['Margin'].sum() if not self.combined_data.empty else 0,
-                'total_cogs': self.combined_data['COGS Total'].sum() if not self.combined_data.empty else 0,
-                'avg_cogs_percentage': self.combined_data['COGS Total (%)'].mean() if not self.combined_data.empty else 0,
-                'total_transactions': len(self.combined_data) if not self.combined_data.empty else 0,
-                'unique_products': self.combined_data['Menu'].nunique() if not self.combined_data.empty else 0,
-                'avg_transaction_value': self.combined_data['Total'].mean() if not self.combined_data.empty else 0,
+                'total_revenue': self._total_revenue,
+                'total_margin': self._total_margin,
+                'total_cogs': self._total_cogs,
+                'avg_cogs_percentage': self._avg_cogs_pct,
+                'total_transactions': self.total_records,
+                'unique_products': self._unique_products,
+                'avg_transaction_value': self._avg_transaction,
                 'files_processed': self.branch_files
             }
         except Exception as e:
-            print(f"❌ Error in get_branch_summary_stats: {e}")
+            logger.error("❌ Error in get_branch_summary_stats: %s", e)
             return {
                 'total_branches': 0,
                 'total_records': 0,
@@ -552,17 +743,17 @@ class MultiBranchSalesAnalyzer:
             product_comparison = self.get_product_comparison_by_branch()
             
             if not product_comparison.empty:
-                # Find products available in most branches
-                product_branch_count = product_comparison.groupby('Menu')['Branch'].nunique().reset_index()
-                product_branch_count.columns = ['Menu', 'Available_Branches']
-                product_branch_count['Availability_Percentage'] = (
-                    product_branch_count['Available_Branches'] / max(len(self.branches), 1) * 100
-                )
+                # Tiap baris product_comparison = satu kombinasi (Menu, Branch) unik, sehingga
+                # jumlah cabang per menu = jumlah baris per kode menu (bincount, tanpa groupby.nunique)
+                codes, _ = _menu_codes(product_comparison['Menu'])
+                available_branches = np.bincount(codes)
+                available_branches = available_branches[available_branches > 0]
+                availability_pct = available_branches / max(len(self.branches), 1) * 100
                 
                 insights['product_consistency'] = {
-                    'universal_products': len(product_branch_count[product_branch_count['Availability_Percentage'] == 100]),
-                    'limited_products': len(product_branch_count[product_branch_count['Availability_Percentage'] < 50]),
-                    'avg_availability': product_branch_count['Availability_Percentage'].mean()
+                    'universal_products': int(np.count_nonzero(availability_pct == 100)),
+                    'limited_products': int(np.count_nonzero(availability_pct < 50)),
+                    'avg_availability': availability_pct.mean()
                 }
             else:
                 insights['product_consistency'] = {
@@ -575,17 +766,27 @@ class MultiBranchSalesAnalyzer:
             cogs_data = self.get_cogs_per_product_per_branch()
             
             if not cogs_data.empty:
-                cogs_variance = cogs_data.groupby('Menu')['COGS Total (%)'].agg(['mean', 'std']).reset_index()
-                cogs_variance['CV'] = np.where(
-                    cogs_variance['mean'] > 0,
-                    cogs_variance['std'] / cogs_variance['mean'],
-                    0
-                )
+                # Mean/std (ddof=1) per menu lewat bincount atas kode Menu, tanpa groupby.agg
+                codes, menus = _menu_codes(cogs_data['Menu'])
+                values = cogs_data['COGS Total (%)'].to_numpy(dtype=float)
+                counts = np.bincount(codes, minlength=len(menus))
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    mean = np.bincount(codes, weights=values, minlength=len(menus)) / counts
+                    deviation = values - mean[codes]
+                    # Menu di satu cabang saja: 0/0 -> NaN, sama seperti std() pandas
+                    std = np.sqrt(np.bincount(codes, weights=deviation * deviation, minlength=len(menus)) / (counts - 1))
+                    cv = np.where(mean > 0, std / mean, 0)
+                
+                # Kategori Menu yang tidak muncul di cogs_data tidak ikut dihitung
+                present = counts > 0
+                if not present.all():
+                    cv, menus = cv[present], menus[present]
                 
+                has_cv = ~np.isnan(cv)
                 insights['cogs_consistency'] = {
-                    'high_variance_products': len(cogs_variance[cogs_variance['CV'] > 0.2]),
-                    'avg_cogs_variance': cogs_variance['CV'].mean(),
-                    'most_consistent_cogs': cogs_variance.loc[cogs_variance['CV'].idxmin(), 'Menu'] if not cogs_variance.empty else None
+                    'high_variance_products': int(np.count_nonzero(cv > 0.2)),
+                    'avg_cogs_variance': cv[has_cv].mean() if has_cv.any() else np.nan,
+                    'most_consistent_cogs': menus[np.nanargmin(cv)] if has_cv.any() else None
                 }
             else:
                 insights['cogs_consistency'] = {
@@ -595,7 +796,7 @@ class MultiBranchSalesAnalyzer:
                 }
                 
         except Exception as e:
-            print(f"❌ Error in get_cross_branch_insights: {e}")
+            logger.error("❌ Error in get_cross_branch_insights: %s", e)
             insights = {
                 'revenue_concentration': {'top_3_branches_share': 0, 'bottom_3_branches_share': 0, 'revenue_inequality': 0},
                 'product_consistency': {'universal_products': 0, 'limited_products': 0, 'avg_availability': 0},
@@ -604,6 +805,7 @@ class MultiBranchSalesAnalyzer:
         
         return insights
     
+    @_cached_result
     def prepare_data_for_ai(self):
         """
         Mempersiapkan data summary untuk AI chatbot dengan SAFE calculations.
@@ -622,7 +824,7 @@ class MultiBranchSalesAnalyzer:
             
             # Top products across all branches
             if not self.combined_data.empty:
-                top_products = self.combined_data.groupby('Menu').agg({
+                top_products = self.combined_data.groupby('Menu', observed=True).agg({
                     'Qty': 'sum',
                     'Total': 'sum',
                     'Margin': 'sum'
@@ -652,7 +854,7 @@ class MultiBranchSalesAnalyzer:
             return ai_context
             
         except Exception as e:
-            print(f"❌ Error in prepare_data_for_ai: {e}")
+            logger.error("❌ Error in prepare_data_for_ai: %s", e)
             return {
                 'summary': {'total_branches': 0, 'total_records': 0},
                 'branch_performance': {'best_branch': {'name': 'N/A', 'revenue': 0, 'margin_pct': 0}, 'worst_branch': {'name': 'N/A', 'revenue': 0, 'margin_pct': 0}},